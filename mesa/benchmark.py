@@ -0,0 +1,191 @@
+"""
+Benchmarks for ShipPortModel.
+
+Times model construction (terrain rasterization, port loading, navigation
+fields and the full constructor), steps split into simulation and data
+collection, and full replicate runs over a matrix of fleet sizes, grid sizes
+and engines. Every measurement is written as one JSON line, tagged with the
+commit and machine, so results from different commits on the same box can be
+compared.
+
+Example:
+    python benchmark.py --output bench.jsonl
+    python benchmark.py --ships 300 1000 --grids 100x100 --engines fast --repeat 5
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import port_table
+from mesa_model import ShipPortModel
+from port_table import PORT_CSV, load_port_table, parse_port_csv
+from terrain import LAND_REGIONS, rasterize_water
+from world import World, navigation_directions
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SHIP_COUNTS = (50, 300, 1000, 5000)
+GRID_SIZES = ((100, 100), (200, 200))
+ENGINES = ("agent", "fast")
+
+
+def environment():
+    """Commit and machine the results were measured on."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def timed(func, repeat):
+    """Runs func repeat times and returns the wall-clock times in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def summary(times):
+    return {"min_s": min(times), "median_s": statistics.median(times), "repeat": len(times)}
+
+
+def build_model(width, height, num_ships, engine, seed=0):
+    return ShipPortModel(width, height, num_ships, ship_wait_time=100, seed=seed, engine=engine,
+                         custom_port_policies="goteborg:ban, aarhus:ban, rotterdam:tax")
+
+
+def bench_construction(width, height, num_ships, engine, repeat):
+    """
+    Terrain rasterization, port loading (CSV parsing and the cached .npz),
+    navigation fields, the constructor with cold
+    navigation fields (computed instead of loaded from the disk cache), with
+    a World that is not built in this process yet (its navigation tables come
+    from the disk cache) and with warm caches.
+    """
+    def rasterize():
+        rasterize_water(LAND_REGIONS, width, height, cache_dir=None)
+    results = {"terrain_rasterization": summary(timed(rasterize, repeat))}
+
+    # port loading: parsing the CSV, and loading its .npz copy in a process that has no table yet
+    results["port_parsing"] = summary(timed(lambda: parse_port_csv(PORT_CSV), repeat))
+    load_port_table()
+
+    def load_ports():
+        port_table._tables.clear()
+        load_port_table()
+    results["port_loading"] = summary(timed(load_ports, repeat))
+
+    world = World.get(width, height)
+
+    def navigation_fields():
+        navigation_directions(world.passable, world.port_cells, world.exit_cells, cache_dir=None)
+    results["navigation_fields"] = summary(timed(navigation_fields, repeat))
+
+    def cold_navigation_model():
+        World._instances.clear()
+        World._instances[(width, height, None)] = World(width, height, World.build(width, height, cache_dir=None))
+        build_model(width, height, num_ships, engine)
+    results["construction_cold_navigation"] = summary(timed(cold_navigation_model, repeat))
+
+    def cold_model():
+        World._instances.clear()
+        build_model(width, height, num_ships, engine)
+    results["construction_cold_world"] = summary(timed(cold_model, repeat))
+    build_model(width, height, num_ships, engine)
+    results["construction"] = summary(timed(lambda: build_model(width, height, num_ships, engine), repeat))
+    return results
+
+
+def bench_steps(width, height, num_ships, engine, steps, warmup):
+    """
+    Per-step times after warmup steps, split into simulation (spawning,
+    discharge aging, ship and port updates) and datacollector.collect.
+    """
+    model = build_model(width, height, num_ships, engine)
+    for _ in range(warmup):
+        model.step()
+    collect_times = []
+    collect = model.datacollector.collect
+
+    def timed_collect(m):
+        start = time.perf_counter()
+        collect(m)
+        collect_times.append(time.perf_counter() - start)
+    model.datacollector.collect = timed_collect
+
+    step_times = timed(model.step, steps)
+    simulate_times = [step - c for step, c in zip(step_times, collect_times)]
+    return {
+        "step": summary(step_times),
+        "step_simulate": summary(simulate_times),
+        "step_collect": summary(collect_times),
+    }
+
+
+def bench_replicate(width, height, num_ships, engine, steps, repeat):
+    """A full replicate: construction plus steps."""
+    def replicate():
+        model = build_model(width, height, num_ships, engine)
+        for _ in range(steps):
+            model.step()
+    return {"replicate": summary(timed(replicate, repeat))}
+
+
+def parse_grid(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ShipPortModel construction, stepping and full runs.")
+    parser.add_argument("--ships", type=int, nargs="+", default=list(SHIP_COUNTS))
+    parser.add_argument("--grids", type=parse_grid, nargs="+", default=list(GRID_SIZES), help="e.g. 100x100 500x500")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions of construction and replicate timings")
+    parser.add_argument("--steps", type=int, default=50, help="timed steps per configuration")
+    parser.add_argument("--warmup", type=int, default=20, help="steps run before timing steps")
+    parser.add_argument("--replicate-steps", type=int, default=200)
+    parser.add_argument("--output", help="append JSON lines to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    env = environment()
+    out = open(args.output, "a") if args.output else sys.stdout
+    try:
+        for width, height in args.grids:
+            for engine in args.engines:
+                for num_ships in args.ships:
+                    config = {"width": width, "height": height, "num_ships": num_ships, "engine": engine}
+                    results = {}
+                    results.update(bench_construction(width, height, num_ships, engine, args.repeat))
+                    results.update(bench_steps(width, height, num_ships, engine, args.steps, args.warmup))
+                    results.update(bench_replicate(width, height, num_ships, engine, args.replicate_steps, args.repeat))
+                    for name, timing in results.items():
+                        record = dict(env, **config, benchmark=name, **timing)
+                        out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    print(f"{width}x{height} {engine} {num_ships} ships: "
+                          f"step {results['step']['median_s'] * 1000:.2f} ms, "
+                          f"replicate {results['replicate']['median_s']:.2f} s", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
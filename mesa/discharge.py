@@ -0,0 +1,67 @@
+"""
+Scrubber discharge field of ShipPortModel.
+
+Replaces the ScrubberTrail agents that scrubber ships used to leave in every
+cell they moved to. The field holds the live discharge of every cell in
+arrays, so it adds no agents to the schedule or the grid.
+"""
+import numpy as np
+
+
+class DischargeField:
+    """
+    Scrubber water discharged by ships, stored per grid cell.
+
+    Each discharge puts water_units into a cell for lifespan steps, like a
+    ScrubberTrail agent used to. Discharges are kept in a ring buffer with one
+    slot per step of age, so aging the whole field is a single vectorized
+    update per step instead of one agent step per trail.
+    """
+    def __init__(self, width, height, lifespan=60, water_units=10):
+        self.width = width
+        self.height = height
+        self.lifespan = lifespan
+        self.water_units = water_units
+        # number of live trails in every cell, indexed as trails[x, y]
+        self.trails = np.zeros((width, height), dtype=np.int32)
+        # flat cell indices discharged in each of the last `lifespan` steps
+        self._slots = [[] for _ in range(lifespan)]
+        self._current = 0
+        # running total of live trails, so reporters don't have to sum the grid
+        self._num_trails = 0
+
+    def add(self, pos):
+        """Discharge one trail of scrubber water at pos."""
+        x, y = pos
+        self.trails[x, y] += 1
+        self._slots[self._current].append(x * self.height + y)
+        self._num_trails += 1
+
+    def add_many(self, xs, ys):
+        """Discharge one trail at each of the cells (xs[i], ys[i])."""
+        if len(xs) == 0:
+            return
+        flat = np.asarray(xs) * self.height + np.asarray(ys)
+        np.add.at(self.trails.reshape(-1), flat, 1)
+        self._slots[self._current].extend(flat.tolist())
+        self._num_trails += len(flat)
+
+    def step(self):
+        """Age the field by one step, removing trails that reached their lifespan."""
+        self._current = (self._current + 1) % self.lifespan
+        expired = self._slots[self._current]
+        if expired:
+            np.subtract.at(self.trails.reshape(-1), expired, 1)
+            self._num_trails -= len(expired)
+            self._slots[self._current] = []
+
+    @property
+    def water(self):
+        """Scrubber water per cell."""
+        return self.trails * self.water_units
+
+    def num_trails(self):
+        return self._num_trails
+
+    def total_water(self):
+        return self.num_trails() * self.water_units
@@ -0,0 +1,601 @@
+"""
+Shared runner for the scrubber ban experiments.
+
+A scenario names the ports and/or countries that ban scrubbers together with
+the model settings. Its replicates are fanned out over a process pool, each
+with its own seed, and merged back in replicate order. The analysis and plots
+that used to be copied between the experiment scripts live here as well.
+
+Example:
+    python experiment.py sweden_denmark --runs 20 --steps 1000 --workers 8
+    python experiment.py custom --ban-countries NL,BE --num-ships 500
+"""
+
+import argparse
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from mesa_model import ShipPortModel
+from port_table import load_port_table
+from replicate_cache import load_replicate, replicate_key, save_replicate
+from world import World
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+GRAPH_DIR = os.path.join(BASE_DIR, "graphs")
+
+# model reporters that are averaged over replicates, keyed by their output name
+METRICS = {
+    "discharge": "TotalScrubberWater",
+    "revenue": "TotalPortRevenue",
+    "docked": "TotalDockedShips",
+    "num_ships": "NumShips",
+    "ports_ban": "NumPortsBan",
+    "ports_tax": "NumPortsTax",
+    "ports_subsidy": "NumPortsSubsidy",
+    "ports_allow": "NumPortsAllow",
+}
+
+
+def load_port_countries():
+    """
+    Port name (lower case) -> country code, from the port table.
+    """
+    return load_port_table().port_to_country()
+
+
+class Scenario:
+    """
+    A policy scenario: the ports and countries that ban scrubbers, the model
+    settings and how many replicates to run.
+    ban_countries may be "all" to ban scrubbers in every port.
+    """
+    def __init__(self, name, ban_countries=(), ban_ports=(), num_ships=300, ship_wait_time=100,
+                 num_steps=1000, num_runs=20, width=100, height=100, port_policy="allow", seed=0,
+                 desired_ports=(), data_file=None, graph_prefix=None, plot_start=0, coastline=None):
+        self.name = name
+        self.ban_countries = ban_countries if ban_countries == "all" else tuple(c.upper() for c in ban_countries)
+        self.ban_ports = tuple(p.lower() for p in ban_ports)
+        self.num_ships = num_ships
+        self.ship_wait_time = ship_wait_time
+        self.num_steps = num_steps
+        self.num_runs = num_runs
+        self.width = width
+        self.height = height
+        # lat/lon GeoJSON coastline, or None for the built-in land regions
+        self.coastline = coastline
+        self.port_policy = port_policy
+        # replicate i runs with seed + i, so scenarios with the same seed share random streams
+        self.seed = seed
+        # ports that also get their own relative revenue/docking series
+        self.desired_ports = tuple(desired_ports)
+        self.data_file = data_file or f"{name}_exp_data.parquet"
+        self.graph_prefix = graph_prefix or name
+        # first timestep shown in the plots (earlier steps are warm-up)
+        self.plot_start = plot_start
+
+    def banned_ports(self, port_to_country):
+        """Names of all ports that ban scrubbers in this scenario."""
+        return [port for port, country in port_to_country.items()
+                if self.ban_countries == "all" or country in self.ban_countries or port in self.ban_ports]
+
+    def custom_port_policies(self, port_to_country):
+        """The banned ports in the "name:ban, ..." format ShipPortModel expects."""
+        ban_ports = self.banned_ports(port_to_country)
+        if not ban_ports:
+            return "None"
+        return ", ".join(f"{port}:ban" for port in ban_ports)
+
+    def model_params(self, port_to_country):
+        return {
+            "width": self.width,
+            "height": self.height,
+            "num_ships": self.num_ships,
+            "ship_wait_time": self.ship_wait_time,
+            "port_policy": self.port_policy,
+            "selected_port": "None",
+            "selected_policy": "None",
+            "custom_port_policies": self.custom_port_policies(port_to_country),
+            "coastline": self.coastline,
+        }
+
+
+SCENARIOS = {
+    "sweden_denmark": Scenario(
+        "sweden_denmark", ban_countries=("SE", "DK"),
+        desired_ports=("amsterdam", "rotterdam", "london", "antwerpen", "hamburg"),
+        data_file="sweden_denmark_ban_exp_data.parquet", graph_prefix="sweden_denmark_ban"),
+    "nl": Scenario(
+        "nl", ban_countries=("SE", "DK", "NL"),
+        data_file="sweden_denmark_netherlands_ban_exp_data.parquet", graph_prefix="nl_ban", plot_start=200),
+    "all_countries": Scenario(
+        "all_countries", ban_countries="all",
+        data_file="all_countries_ban_exp_data.parquet", graph_prefix="all_countries_ban", plot_start=200),
+}
+
+
+@contextmanager
+def worker_pool(workers, scenario):
+    """
+    Process pool whose workers attach to one shared-memory copy of the
+    scenario's World instead of each building their own.
+    """
+    shared = World.get(scenario.width, scenario.height, scenario.coastline).share()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=World.attach, initargs=(shared,)) as executor:
+            yield executor
+    finally:
+        shared.unlink()
+
+
+def run_replicate(scenario, seed, port_to_country=None, profile=False):
+    """
+    Runs one replicate of the scenario and returns its collected series:
+    the averaged model reporters plus per-port revenue and docking frames,
+    and with profile the per-step phase timings.
+    """
+    if port_to_country is None:
+        port_to_country = load_port_countries()
+    model = ShipPortModel(**scenario.model_params(port_to_country), seed=seed, profile=profile)
+    for _ in range(scenario.num_steps):
+        model.step()
+    result = replicate_result(model)
+    if profile:
+        result["profile"] = model.profile_frame()
+    return result
+
+
+def replicate_result(model):
+    """The collected series of a finished replicate."""
+    return {
+        "model_vars": model.datacollector.get_model_vars_dataframe(),
+        "port_revenue": model.port_recorder.revenue_frame(),
+        "port_docking": model.port_recorder.docking_frame(),
+    }
+
+
+def iter_replicates(scenario, workers=None, port_to_country=None, use_cache=True, profile=False):
+    """
+    Yields (replicate index, result) for all replicates of the scenario as
+    they become available: cached replicates first, then the simulated ones
+    in replicate order, so callers can aggregate without holding them all.
+    workers=1 runs them in this process. Profiled runs are never cached,
+    since their timings belong to the run.
+    """
+    if port_to_country is None:
+        port_to_country = load_port_countries()
+    use_cache = use_cache and not profile
+    seeds = [scenario.seed + run for run in range(scenario.num_runs)]
+    keys = [None] * len(seeds)
+    missing = list(range(len(seeds)))
+    if use_cache:
+        params = scenario.model_params(port_to_country)
+        keys = [replicate_key(params, scenario.num_steps, seed) for seed in seeds]
+        missing = []
+        for i, key in enumerate(keys):
+            result = load_replicate(key)
+            if result is None:
+                missing.append(i)
+            else:
+                yield i, result
+        if len(missing) < len(seeds):
+            print(f"{scenario.name}: reused {len(seeds) - len(missing)} cached replicates")
+    if not missing:
+        return
+    missing_seeds = [seeds[i] for i in missing]
+    progress = tqdm(total=len(missing), desc=f"{scenario.name} runs")
+    if workers == 1:
+        computed = (run_replicate(scenario, seed, port_to_country, profile) for seed in missing_seeds)
+        for i, result in zip(missing, computed):
+            if use_cache:
+                save_replicate(keys[i], result)
+            progress.update()
+            yield i, result
+    else:
+        with worker_pool(workers, scenario) as executor:
+            computed = executor.map(run_replicate, [scenario] * len(missing), missing_seeds,
+                                    [port_to_country] * len(missing), [profile] * len(missing))
+            for i, result in zip(missing, computed):
+                if use_cache:
+                    save_replicate(keys[i], result)
+                progress.update()
+                yield i, result
+    progress.close()
+
+
+def run_replicates(scenario, workers=None, port_to_country=None, use_cache=True):
+    """
+    Runs all replicates of the scenario over a process pool and returns their
+    results in replicate order. With use_cache, replicates found in the
+    on-disk cache are reused and only the missing ones are simulated.
+    """
+    results = [None] * scenario.num_runs
+    for i, result in iter_replicates(scenario, workers, port_to_country, use_cache):
+        results[i] = result
+    return results
+
+
+def baseline_scenario(scenarios):
+    """
+    The policy-free scenario that forked scenarios share their warm-up with.
+    Forked scenarios must only differ in their bans.
+    """
+    first = scenarios[0]
+    for scenario in scenarios[1:]:
+        for attr in ("num_ships", "ship_wait_time", "num_steps", "num_runs", "width", "height",
+                     "coastline", "port_policy", "seed"):
+            if getattr(scenario, attr) != getattr(first, attr):
+                raise ValueError(f"scenarios {first.name} and {scenario.name} differ in {attr} and cannot share a baseline")
+    baseline = copy.copy(first)
+    baseline.name = "baseline"
+    baseline.ban_countries = ()
+    baseline.ban_ports = ()
+    return baseline
+
+
+def fork_params(scenario, baseline, warmup_steps, port_to_country):
+    """Model parameters of a forked scenario, as used for its cache key."""
+    params = scenario.model_params(port_to_country)
+    params["baseline_port_policies"] = baseline.custom_port_policies(port_to_country)
+    params["fork_step"] = warmup_steps
+    return params
+
+
+def run_forked_replicate(scenarios, warmup_steps, seed, port_to_country=None):
+    """
+    Runs one replicate of the baseline for warmup_steps, then forks it into
+    every scenario, applies that scenario's bans and runs it to the end.
+    Returns the results in scenario order.
+    """
+    if port_to_country is None:
+        port_to_country = load_port_countries()
+    baseline = baseline_scenario(scenarios)
+    model = ShipPortModel(**baseline.model_params(port_to_country), seed=seed)
+    for _ in range(warmup_steps):
+        model.step()
+    results = []
+    for scenario in scenarios:
+        variant = model.fork(scenario.custom_port_policies(port_to_country))
+        for _ in range(scenario.num_steps - warmup_steps):
+            variant.step()
+        results.append(replicate_result(variant))
+    return results
+
+
+def iter_forked_replicates(scenarios, warmup_steps, workers=None, port_to_country=None, use_cache=True):
+    """
+    Like iter_replicates for scenarios forked from a shared baseline: yields
+    (replicate index, results in scenario order). A replicate is simulated
+    again when any of its scenarios is missing from the cache.
+    """
+    if port_to_country is None:
+        port_to_country = load_port_countries()
+    baseline = baseline_scenario(scenarios)
+    if not 0 <= warmup_steps <= baseline.num_steps:
+        raise ValueError(f"warm-up of {warmup_steps} steps does not fit in {baseline.num_steps} steps")
+    seeds = [baseline.seed + run for run in range(baseline.num_runs)]
+    keys = [[None] * len(scenarios) for _ in seeds]
+    missing = list(range(len(seeds)))
+    if use_cache:
+        params = [fork_params(scenario, baseline, warmup_steps, port_to_country) for scenario in scenarios]
+        keys = [[replicate_key(p, baseline.num_steps, seed) for p in params] for seed in seeds]
+        missing = []
+        for i, replicate_keys in enumerate(keys):
+            results = [load_replicate(key) for key in replicate_keys]
+            if any(result is None for result in results):
+                missing.append(i)
+            else:
+                yield i, results
+        if len(missing) < len(seeds):
+            print(f"reused {len(seeds) - len(missing)} cached forked replicates")
+    if not missing:
+        return
+    missing_seeds = [seeds[i] for i in missing]
+    progress = tqdm(total=len(missing), desc="forked runs")
+    if workers == 1:
+        computed = (run_forked_replicate(scenarios, warmup_steps, seed, port_to_country) for seed in missing_seeds)
+        for i, results in zip(missing, computed):
+            if use_cache:
+                for key, result in zip(keys[i], results):
+                    save_replicate(key, result)
+            progress.update()
+            yield i, results
+    else:
+        with worker_pool(workers, baseline) as executor:
+            computed = executor.map(run_forked_replicate, [scenarios] * len(missing), [warmup_steps] * len(missing),
+                                    missing_seeds, [port_to_country] * len(missing))
+            for i, results in zip(missing, computed):
+                if use_cache:
+                    for key, result in zip(keys[i], results):
+                        save_replicate(key, result)
+                progress.update()
+                yield i, results
+    progress.close()
+
+
+def relative(avg_series, ci_series):
+    """Scales a mean series and its CI by the overall mean of the series."""
+    overall_avg = avg_series.mean() if not avg_series.empty else 0
+    if overall_avg == 0:
+        return avg_series, ci_series
+    return avg_series / overall_avg, ci_series / overall_avg
+
+
+def country_frame(port_frame, port_to_country, countries):
+    """Sums per-port columns into per-country columns."""
+    country_df = port_frame.T.groupby(port_frame.columns.map(port_to_country)).sum().T
+    return country_df.reindex(columns=countries, fill_value=0)
+
+
+class ReplicateSummary:
+    """
+    Streaming mean and 95% CI over replicates, per step and per series.
+
+    Each replicate is reduced to its summary series (the metrics, the desired
+    ports and every country) as soon as it is added and folded into running
+    means and squared deviations with Welford's update, so memory does not
+    grow with the number of replicates. frame() can be called at any point and
+    gives the avg_*/ci_* and relative_* columns of the experiment parquet file.
+    """
+    def __init__(self, scenario, port_to_country):
+        self.scenario = scenario
+        self.port_to_country = port_to_country
+        self.countries = sorted(set(port_to_country.values()))
+        self.count = 0
+        self.index = None
+        self.names = None
+        self._mean = None
+        self._m2 = None
+
+    def _series(self, result):
+        # every series that gets averaged, in output order
+        series = {}
+        for name, reporter in METRICS.items():
+            series[name] = result["model_vars"][reporter]
+        for port in self.scenario.desired_ports:
+            series[f"revenue_{port}"] = result["port_revenue"][port]
+            series[f"docking_{port}"] = result["port_docking"][port]
+        for key, frame in (("revenue", "port_revenue"), ("docking", "port_docking")):
+            country_df = country_frame(result[frame], self.port_to_country, self.countries)
+            for country in self.countries:
+                series[f"{key}_{country}"] = country_df[country]
+        return series
+
+    def add(self, result):
+        """Folds one replicate's result into the running statistics."""
+        series = self._series(result)
+        values = np.column_stack([np.asarray(s, dtype=float) for s in series.values()])
+        if self.count == 0:
+            self.index = result["model_vars"].index
+            self.names = list(series)
+            self._mean = np.zeros_like(values)
+            self._m2 = np.zeros_like(values)
+        self.count += 1
+        delta = values - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (values - self._mean)
+
+    def mean_ci(self):
+        """Mean and 95% CI frames with one column per series."""
+        mean = pd.DataFrame(self._mean, index=self.index, columns=self.names)
+        if self.count > 1:
+            std = np.sqrt(self._m2 / (self.count - 1))
+        else:
+            std = np.full_like(self._mean, np.nan)
+        ci = pd.DataFrame(1.96 * std / np.sqrt(self.count), index=self.index, columns=self.names)
+        return mean, ci
+
+    def frame(self):
+        """The summary of the replicates added so far."""
+        mean, ci = self.mean_ci()
+        all_data = {}
+        for name in METRICS:
+            all_data[f"avg_{name}"] = mean[name]
+            all_data[f"ci_{name}"] = ci[name]
+
+        # Overall relative revenue
+        all_data["relative_revenue"], all_data["ci_relative"] = relative(all_data["avg_revenue"], all_data["ci_revenue"])
+
+        # Per-port relative revenue and docking
+        for port in self.scenario.desired_ports:
+            for key in ("revenue", "docking"):
+                name = f"{key}_{port}"
+                all_data[f"relative_{name}"], all_data[f"ci_relative_{name}"] = relative(mean[name], ci[name])
+
+        # Per-country relative revenue and docking
+        for key in ("revenue", "docking"):
+            for country in self.countries:
+                name = f"{key}_{country}"
+                all_data[f"relative_{name}"], all_data[f"ci_relative_{name}"] = relative(mean[name], ci[name])
+
+        return pd.DataFrame(all_data)
+
+
+def summarize(scenario, results, port_to_country):
+    """
+    Averages the replicates into the avg_*/ci_* and relative_* columns
+    written to the experiment parquet file.
+    """
+    summary = ReplicateSummary(scenario, port_to_country)
+    for result in results:
+        summary.add(result)
+    return summary.frame()
+
+
+def pyplot():
+    # matplotlib is only needed for the plots, so replicate workers never import it
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_with_ci(x, y, ci, label, color, ylabel, title, fname):
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(8,6))
+    ax.plot(x, y, color=color, label=label)
+    ax.fill_between(x, y - ci, y + ci, color=color, alpha=0.2)
+    ax.set_xlabel("Timestep")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend()
+    fig.savefig(fname)
+    plt.close(fig)
+
+
+def plot_relative_country(all_df, key, countries, ylabel, title, fname, plot_start=0, legend_loc="lower right"):
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(8,6))
+    for country in countries:
+        rel_series = all_df[f"relative_{key}_{country}"][plot_start:]
+        rel_ci_series = all_df[f"ci_relative_{key}_{country}"][plot_start:]
+        ax.plot(rel_series.index, rel_series.values, label=country)
+        ax.fill_between(rel_series.index, (rel_series - rel_ci_series).values,
+                        (rel_series + rel_ci_series).values, alpha=0.2)
+    ax.set_xlabel("Timestep")
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.legend(loc=legend_loc)
+    fig.savefig(fname)
+    plt.close(fig)
+
+
+def plot_scenario(scenario, all_df, countries):
+    """Scrubber water and relative revenue/docking per country plots."""
+    os.makedirs(GRAPH_DIR, exist_ok=True)
+    prefix = os.path.join(GRAPH_DIR, scenario.graph_prefix)
+    avg_discharge = all_df["avg_discharge"][scenario.plot_start:]
+    ci_discharge = all_df["ci_discharge"][scenario.plot_start:]
+    plot_with_ci(avg_discharge.index, avg_discharge.values, ci_discharge.values, "Avg Scrubber Water", "brown",
+                 "Scrubber Water", "Total Scrubber Water over Time", f"{prefix}_total_scrubber_water.png")
+    plot_relative_country(all_df, "revenue", countries, "Relative Revenue",
+                          "Relative Revenue per Country over Time",
+                          f"{prefix}_relative_revenue_per_country.png", scenario.plot_start)
+    plot_relative_country(all_df, "docking", countries, "Relative Docking Frequency",
+                          "Relative Docking Frequency per Country over Time",
+                          f"{prefix}_relative_docking_frequency_per_country.png", scenario.plot_start)
+
+
+def run_experiment(scenario, workers=None, plot=True, use_cache=True, profile=False):
+    """
+    Runs the scenario's replicates (reusing cached ones), saves the summary to
+    data/ and the plots to graphs/. Returns the summary DataFrame.
+    With profile, the per-step phase timings of every replicate are saved to
+    data/ as well.
+    """
+    port_to_country = load_port_countries()
+    # replicates are folded into the summary as they finish instead of kept around
+    summary = ReplicateSummary(scenario, port_to_country)
+    profiles = {}
+    for i, result in iter_replicates(scenario, workers, port_to_country, use_cache, profile):
+        summary.add(result)
+        if profile:
+            profiles[i] = result["profile"]
+    all_df = summary.frame()
+    save_summary(scenario, all_df, port_to_country, plot)
+    if profile:
+        profile_df = pd.concat(profiles, names=["replicate", "step"]).sort_index()
+        profile_df.to_parquet(os.path.join(DATA_DIR, f"{scenario.name}_profile.parquet"))
+    return all_df
+
+
+def run_forked_experiment(scenarios, warmup_steps, workers=None, plot=True, use_cache=True):
+    """
+    Runs the scenarios as forks of one shared baseline per replicate: the
+    policy-free model runs warmup_steps once and every scenario continues from
+    a copy of that state with its own bans. Saves each scenario's summary and
+    plots like run_experiment and returns the summaries by scenario name.
+    """
+    port_to_country = load_port_countries()
+    summaries = [ReplicateSummary(scenario, port_to_country) for scenario in scenarios]
+    for _, results in iter_forked_replicates(scenarios, warmup_steps, workers, port_to_country, use_cache):
+        for summary, result in zip(summaries, results):
+            summary.add(result)
+    frames = {}
+    for scenario, summary in zip(scenarios, summaries):
+        frames[scenario.name] = summary.frame()
+        save_summary(scenario, frames[scenario.name], port_to_country, plot)
+    return frames
+
+
+def save_summary(scenario, all_df, port_to_country, plot=True):
+    """Writes the scenario's summary to data/ and, with plot, its plots to graphs/."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    all_df.to_parquet(os.path.join(DATA_DIR, scenario.data_file))
+    if plot:
+        plot_scenario(scenario, all_df, sorted(set(port_to_country.values())))
+
+
+def parse_list(value):
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a scrubber ban scenario over a pool of replicates.")
+    parser.add_argument("scenario", nargs="+", choices=sorted(SCENARIOS) + ["custom"],
+                        help="predefined scenario(s), or 'custom' together with --ban-countries/--ban-ports")
+    parser.add_argument("--name", help="name of the scenario, used for its output files")
+    parser.add_argument("--ban-countries", type=parse_list, help="comma separated country codes, or 'all'")
+    parser.add_argument("--ban-ports", type=parse_list, help="comma separated port names")
+    parser.add_argument("--num-ships", type=int)
+    parser.add_argument("--ship-wait-time", type=int)
+    parser.add_argument("--steps", type=int)
+    parser.add_argument("--runs", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--grid", help="grid size as WIDTHxHEIGHT, e.g. 500x500")
+    parser.add_argument("--coastline", help="GeoJSON file with the land polygons in lon/lat")
+    parser.add_argument("--warmup", type=int, default=None,
+                        help="run a policy-free baseline for this many steps once per replicate "
+                             "and fork every scenario from it")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--no-plots", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="rerun every replicate instead of reusing cached ones")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every step phase and save the timings next to the data (disables the cache)")
+    args = parser.parse_args(argv)
+
+    if args.name and len(args.scenario) > 1:
+        parser.error("--name needs a single scenario")
+    if args.profile and args.warmup is not None:
+        parser.error("--profile is not supported together with --warmup")
+    scenarios = []
+    for name in args.scenario:
+        if name == "custom":
+            scenario = Scenario(args.name or "custom")
+        else:
+            scenario = copy.copy(SCENARIOS[name])
+        if args.ban_countries is not None:
+            scenario.ban_countries = "all" if args.ban_countries == ("all",) else tuple(c.upper() for c in args.ban_countries)
+        if args.ban_ports is not None:
+            scenario.ban_ports = tuple(p.lower() for p in args.ban_ports)
+        if args.name:
+            # a renamed preset writes its own files instead of overwriting the preset's
+            scenario.name = args.name
+            scenario.data_file = f"{args.name}_exp_data.parquet"
+            scenario.graph_prefix = args.name
+        for attr, value in (("num_ships", args.num_ships), ("ship_wait_time", args.ship_wait_time),
+                            ("num_steps", args.steps), ("num_runs", args.runs), ("seed", args.seed),
+                            ("coastline", args.coastline)):
+            if value is not None:
+                setattr(scenario, attr, value)
+        if args.grid:
+            scenario.width, scenario.height = (int(size) for size in args.grid.lower().split("x"))
+        scenarios.append(scenario)
+
+    if args.warmup is not None:
+        run_forked_experiment(scenarios, args.warmup, workers=args.workers, plot=not args.no_plots,
+                              use_cache=not args.no_cache)
+    else:
+        for scenario in scenarios:
+            run_experiment(scenario, workers=args.workers, plot=not args.no_plots, use_cache=not args.no_cache,
+                           profile=args.profile)
+
+
+if __name__ == "__main__":
+    main()
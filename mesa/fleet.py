@@ -0,0 +1,269 @@
+"""
+Struct-of-arrays ship fleet for ShipPortModel's "fast" engine.
+
+Instead of one Ship agent per vessel, the state of the whole fleet lives in
+NumPy arrays (one slot per ship) and every step advances all ships with
+batched array operations. The rules follow Ship.step: ships follow the
+navigation fields to the ports on their route, dock for 10 steps, get turned
+away by ports that ban scrubbers, time out after ship_wait_time steps without
+docking and leave through the English Channel, where they are replaced.
+
+Ships are updated simultaneously rather than in random order. When more
+ships try to dock at a port than it has room for, a random subset gets in,
+and undocking happens after docking within a step.
+"""
+import numpy as np
+
+from navigation import OFFSETS, AT_TARGET, UNREACHABLE
+from ship import SHIP_TYPES
+
+# steps a ship stays docked before heading to the next port on its route
+DOCKING_TIME = 10
+ROUTE_LENGTH = 3
+
+
+class Fleet:
+    """
+    State of every ship in a ShipPortModel, one array slot per ship.
+    """
+    def __init__(self, model, capacity):
+        self.model = model
+        self.rng = model.rng
+        n = capacity
+        self.active = np.zeros(n, dtype=bool)
+        self.x = np.zeros(n, dtype=np.int32)
+        self.y = np.zeros(n, dtype=np.int32)
+        self.ship_type = np.zeros(n, dtype=np.int8)
+        self.is_scrubber = np.zeros(n, dtype=bool)
+        # port indices of each ship's route and the index of the current target
+        self.route = np.full((n, ROUTE_LENGTH), -1, dtype=np.int16)
+        self.route_len = np.zeros(n, dtype=np.int8)
+        self.target_index = np.zeros(n, dtype=np.int8)
+        self.wait_time = np.zeros(n, dtype=np.int32)
+        self.docking_steps = np.zeros(n, dtype=np.int32)
+        self.docked = np.zeros(n, dtype=bool)
+        self.docked_port = np.full(n, -1, dtype=np.int16)
+        self.exiting = np.zeros(n, dtype=bool)
+        self.exit_x = np.zeros(n, dtype=np.int32)
+        self.exit_y = np.zeros(n, dtype=np.int32)
+        self.penalty = np.zeros(n)
+
+        ports = model.ports
+        self.num_ports = len(ports)
+        self.port_x = np.array([port.pos[0] for port in ports], dtype=np.int32)
+        self.port_y = np.array([port.pos[1] for port in ports], dtype=np.int32)
+        self.port_capacity = np.array([port.port_capacity for port in ports], dtype=np.int32)
+        self.port_occupancy = np.zeros(self.num_ports, dtype=np.int32)
+        self.port_revenue = np.zeros(self.num_ports)
+        self.base_fees = np.array([[port.base_fees.get(t, 40) for t in SHIP_TYPES] for port in ports], dtype=float)
+        self.exit_field_index = self.num_ports
+        self.build_directions()
+
+        self._policy_version = None
+
+    def build_directions(self):
+        # one direction table per port plus the exit zone as the last entry
+        self.directions = self.model.world.directions
+
+    def __getstate__(self):
+        # the direction tables belong to the model's World and are reattached on restore
+        state = self.__dict__.copy()
+        del state["directions"]
+        return state
+
+    def _port_policies(self):
+        # policy flags per port, refreshed whenever a port changes its policy
+        if self._policy_version != self.model.policy_version:
+            policies = [port.scrubber_policy for port in self.model.ports]
+            self.port_ban = np.array([p == "ban" for p in policies], dtype=bool)
+            self.port_tax = np.array([p == "tax" for p in policies], dtype=bool)
+            self.port_subsidy = np.array([p == "subsidy" for p in policies], dtype=bool)
+            self._policy_version = self.model.policy_version
+
+    def spawn(self, n):
+        """Adds n new ships in free slots."""
+        model = self.model
+        free = np.flatnonzero(~self.active)[:n]
+        n = len(free)
+        if n == 0:
+            return
+        ship_type, is_scrubber, start, routes = model.draw_new_ships(n)
+        self.active[free] = True
+        self.x[free] = start[:, 0]
+        self.y[free] = start[:, 1]
+        self.ship_type[free] = ship_type
+        self.is_scrubber[free] = is_scrubber
+        self.route[free] = -1
+        self.route[free, :routes.shape[1]] = routes
+        self.route_len[free] = routes.shape[1]
+        self.target_index[free] = 0
+        self.wait_time[free] = 0
+        self.docking_steps[free] = 0
+        self.docked[free] = False
+        self.docked_port[free] = -1
+        self.exiting[free] = False
+        self.penalty[free] = 0
+
+        model.ship_count += n
+        model.scrubber_ship_count += int(is_scrubber.sum())
+
+    def _greedy_moves(self, idx, tx, ty):
+        """
+        Move.along_route for ships whose target is unreachable on the field:
+        a sign step toward the target, or the passable neighbour closest to it.
+        """
+        passable = self.model.passable
+        width, height = passable.shape
+        x, y = self.x[idx], self.y[idx]
+        ix = x + np.sign(tx - x)
+        iy = y + np.sign(ty - y)
+        ok = passable[ix, iy]
+        new_x = np.where(ok, ix, x)
+        new_y = np.where(ok, iy, y)
+        blocked = np.flatnonzero(~ok)
+        if len(blocked):
+            bx, by = x[blocked][:, None], y[blocked][:, None]
+            nx = bx + OFFSETS[:, 0]
+            ny = by + OFFSETS[:, 1]
+            inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+            valid = inside & passable[np.clip(nx, 0, width - 1), np.clip(ny, 0, height - 1)]
+            distance = np.where(valid, (nx - tx[blocked][:, None]) ** 2 + (ny - ty[blocked][:, None]) ** 2, np.inf)
+            best = np.argmin(distance, axis=1)
+            rows = np.arange(len(blocked))
+            has_move = valid.any(axis=1)
+            new_x[blocked] = np.where(has_move, nx[rows, best], x[blocked])
+            new_y[blocked] = np.where(has_move, ny[rows, best], y[blocked])
+        self.x[idx] = new_x
+        self.y[idx] = new_y
+
+    def step(self):
+        model = self.model
+        self._port_policies()
+        active = self.active
+
+        # ships whose route is done or who waited too long head for the exit
+        done = (self.route_len > 0) & (self.target_index >= self.route_len)
+        start_exit = active & ~self.exiting & (done | (self.wait_time >= model.ship_wait_time))
+        starting = np.flatnonzero(start_exit)
+        if len(starting):
+            self.exiting[starting] = True
+            if len(model.exit_cells):
+                targets = model.exit_cells[self.rng.integers(len(model.exit_cells), size=len(starting))]
+                self.exit_x[starting] = targets[:, 0]
+                self.exit_y[starting] = targets[:, 1]
+            else:
+                self.exit_x[starting] = 0
+                self.exit_y[starting] = 0
+
+        # move every ship that is heading somewhere one cell along its field
+        to_port = active & ~self.exiting & ~self.docked & (self.route_len > 0)
+        moving = np.flatnonzero((active & self.exiting) | to_port)
+        exiting = self.exiting[moving]
+        target = np.where(exiting, -1, self.route[moving, np.minimum(self.target_index[moving], ROUTE_LENGTH - 1)])
+        field = np.where(exiting, self.exit_field_index, target)
+        old_x = self.x[moving].copy()
+        old_y = self.y[moving].copy()
+        code = self.directions[field, old_x, old_y]
+        step = (code >= 0) & (code < AT_TARGET)
+        self.x[moving[step]] += OFFSETS[code[step], 0]
+        self.y[moving[step]] += OFFSETS[code[step], 1]
+        lost = code == UNREACHABLE
+        if lost.any():
+            tx = np.where(exiting, self.exit_x[moving], self.port_x[target])
+            ty = np.where(exiting, self.exit_y[moving], self.port_y[target])
+            self._greedy_moves(moving[lost], tx[lost], ty[lost])
+
+        # scrubber ships that moved leave a trail behind
+        moved = (self.x[moving] != old_x) | (self.y[moving] != old_y)
+        trail = moved & self.is_scrubber[moving]
+        model.discharge.add_many(old_x[trail], old_y[trail])
+
+        # ships that reached the exit zone leave the simulation
+        exiting_ships = moving[exiting]
+        at_exit = ((self.directions[self.exit_field_index, self.x[exiting_ships], self.y[exiting_ships]] == AT_TARGET)
+                   | ((self.x[exiting_ships] == self.exit_x[exiting_ships])
+                      & (self.y[exiting_ships] == self.exit_y[exiting_ships])))
+        leaving = exiting_ships[at_exit]
+
+        # ships in or next to their target port's cell attempt docking
+        port_ships = moving[~exiting]
+        port_target = target[~exiting]
+        near = ((np.abs(self.x[port_ships] - self.port_x[port_target]) <= 1)
+                & (np.abs(self.y[port_ships] - self.port_y[port_target]) <= 1))
+        self._dock(port_ships[near], port_target[near])
+
+        # waiting time only grows for ships that are not docked
+        waiting = active & ~self.exiting & ~self.docked
+        self.wait_time[waiting] += 1
+
+        # docked ships leave after DOCKING_TIME steps and move on to their next port
+        self.docking_steps[self.docked] += 1
+        undocking = np.flatnonzero(self.docked & (self.docking_steps >= DOCKING_TIME))
+        if len(undocking):
+            np.subtract.at(self.port_occupancy, self.docked_port[undocking], 1)
+            self.docked[undocking] = False
+            self.docked_port[undocking] = -1
+            self.target_index[undocking] += 1
+
+        if len(leaving):
+            self.active[leaving] = False
+            model.ship_count -= len(leaving)
+            model.scrubber_ship_count -= int(self.is_scrubber[leaving].sum())
+            # spawn replacement ships so the total remains constant
+            self.spawn(len(leaving))
+        self._sync_ports()
+
+    def _dock(self, ships, ports):
+        model = self.model
+        scrubber = self.is_scrubber[ships]
+        # scrubber ships are turned away by ports that ban them and try their next port
+        rejected = scrubber & self.port_ban[ports]
+        if rejected.any():
+            turned_away = ships[rejected]
+            self.penalty[turned_away] += 1
+            model.scrubber_penalty_sum += int(rejected.sum())
+            model.scrubber_penalty_count += int(rejected.sum())
+            self.target_index[turned_away] += 1
+        ships, ports, scrubber = ships[~rejected], ports[~rejected], scrubber[~rejected]
+        if len(ships) == 0:
+            return
+
+        # when too many ships arrive at once, a random subset gets the free places
+        order = self.rng.permutation(len(ships))
+        ships, ports, scrubber = ships[order], ports[order], scrubber[order]
+        by_port = np.argsort(ports, kind="stable")
+        ships, ports, scrubber = ships[by_port], ports[by_port], scrubber[by_port]
+        first = np.searchsorted(ports, ports, side="left")
+        rank = np.arange(len(ports)) - first
+        occupancy = self.port_occupancy[ports] + rank
+        accepted = occupancy < self.port_capacity[ports]
+        ships, ports, scrubber, occupancy = ships[accepted], ports[accepted], scrubber[accepted], occupancy[accepted]
+        if len(ships) == 0:
+            return
+
+        # docking fee: base fee by ship type and policy, higher the fuller the port
+        fee = self.base_fees[ports, self.ship_type[ships]]
+        fee = np.where(self.port_tax[ports] & scrubber, fee * 1.5, fee)
+        fee = np.where(self.port_subsidy[ports] & ~scrubber, fee * 0.8, fee)
+        capacity = self.port_capacity[ports]
+        fee = fee * (1 + np.where(capacity > 0, occupancy / np.maximum(capacity, 1), 0))
+        np.add.at(self.port_revenue, ports, fee)
+        np.add.at(self.port_occupancy, ports, 1)
+        model.total_port_revenue += float(fee.sum())
+
+        self.docked[ships] = True
+        self.docked_port[ships] = ports
+        self.docking_steps[ships] = 0
+        self.wait_time[ships] = 0
+        # half a penalty for scrubber ships docking at a port that taxes them
+        taxed = ships[scrubber & self.port_tax[ports]]
+        self.penalty[taxed] += 0.5
+        model.scrubber_penalty_sum += 0.5 * len(taxed)
+        model.scrubber_penalty_count += 0.5 * len(taxed)
+
+    def _sync_ports(self):
+        # mirror the fleet's port state onto the Port agents and model counters
+        for port, occupancy, revenue in zip(self.model.ports, self.port_occupancy.tolist(), self.port_revenue.tolist()):
+            port.current_capacity = occupancy
+            port.revenue = revenue
+        self.model.docked_ships_count = int(self.port_occupancy.sum())
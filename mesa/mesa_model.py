@@ -1,40 +1,151 @@
 from mesa import Agent, Model
 import math
+import gzip
+import pickle
+from collections import Counter
 import numpy as np
 from mesa.time import RandomActivation
-from mesa.space import MultiGrid
-#leave this import for now for future data collection and visualization
 from mesa.datacollection import DataCollector
-from mesa.visualization.modules import CanvasGrid
-from mesa.visualization.ModularVisualization import ModularServer
-from mesa.visualization.UserParam import UserSettableParameter, Slider
-import csv
-from shapely.geometry import Polygon, Point
+# the visualization server lives in server.py so the simulation stays headless
 # Import Port and Ship from their modules
 from port import Port
-from ship import Ship, Terrain, ScrubberTrail
+from port_table import load_port_table
+from ship import Ship, SHIP_TYPES, SHIP_TYPE_WEIGHTS, base_scrubber_probability
+from fleet import Fleet
+from profiling import StepProfiler
+from discharge import DischargeField
+from recorder import PortRecorder
+from world import World
+from occupancy import OccupancyGrid
+
+# needs mesa 1.x (mesa.time and the DataCollector); checked with 1.2.0, as pinned in mesa/requirements.txt
+
+# ship type specific factors
+# higher number means they prefer busier ports
+# might need tuning to match empirical data
+SHIP_TYPE_FACTORS = {
+    "cargo": 1.0,
+    "tanker": 1.0,
+    "fishing": 0.8,
+    "other": 0.8,
+    "tug": 0.5,
+    "passenger": 1.2,
+    "hsc": 1.2,
+    "dredging": 0.6,
+    "search": 0.7 
+}
+
+# ship type and base scrubber probabilities as arrays, for drawing ships in bulk
+SHIP_TYPE_PROBABILITIES = np.array(SHIP_TYPE_WEIGHTS) / sum(SHIP_TYPE_WEIGHTS)
+SHIP_SCRUBBER_PROBABILITIES = np.array([base_scrubber_probability(t) for t in SHIP_TYPES])
+
+
+def parse_port_policies(custom_port_policies):
+    """
+    Port name (lower case) -> policy from a "name:policy, name:policy" string;
+    "None" means no custom policies.
+    """
+    policies = {}
+    if custom_port_policies != "None":
+        for pair in custom_port_policies.split(','):
+            if ':' in pair:
+                port_name, policy = pair.split(':', 1)
+                policies[port_name.strip().lower()] = policy.strip()
+    return policies
+
+
+def base_popularity(port):
+    """
+    Base port popularity (based on empirical data).
+    """
+    port_name = port.name.lower()
+    if port_name == "rotterdam":
+        return 8
+    elif port_name == "antwerp":
+        return 5
+    elif port_name in ["amsterdam", "hamburg"]:
+        return 2
+    else:
+        return 1
+
+
+class LivenessRandomActivation(RandomActivation):
+    """
+    RandomActivation that tracks an explicit alive flag on its agents.
+    Removing an agent clears the flag, and agents removed earlier in the same
+    step are skipped with a constant-time check.
+    """
+    def add(self, agent):
+        super().add(agent)
+        agent.alive = True
+
+    def add_many(self, agents):
+        """Adds a batch of agents at once."""
+        agents = list(agents)
+        ids = [agent.unique_id for agent in agents]
+        if len(set(ids)) != len(ids) or any(i in self._agents for i in ids):
+            raise Exception("Agent with duplicate unique id added to scheduler")
+        for agent in agents:
+            agent.alive = True
+        self._agents.update(zip(ids, agents))
+
+    def remove(self, agent):
+        super().remove(agent)
+        agent.alive = False
+
+    def agent_buffer(self, shuffled=False):
+        # snapshot the agents so they can be added and removed while stepping
+        agents = list(self._agents.values())
+        if shuffled:
+            self.model.random.shuffle(agents)
+        for agent in agents:
+            if agent.alive:
+                yield agent
 
-#To run this mesa model it is suggested to pip install mesa version 0.9.0
 
 class ShipPortModel(Model):
     """"
     Simulation class that runs the model logic.
     """
-    def __init__(self, width, height, num_ships, ship_wait_time=20, port_policy="allow", selected_port=None, selected_policy=None, custom_port_policies="None"):
+    def __init__(self, width, height, num_ships, ship_wait_time=20, port_policy="allow", selected_port=None, selected_policy=None, custom_port_policies="None", seed=None, engine="agent", profile=False, coastline=None, tax_multiplier=0.5, subsidy_multiplier=1.5):
+        # seed is picked up by mesa's Model.__new__ to seed self.random
+        # engine "agent" steps one Ship agent per vessel; "fast" keeps the fleet
+        # in arrays (see fleet.py), which scales to many more ships but has no
+        # Ship agents to visualize
+        if engine not in ("agent", "fast"):
+            raise ValueError(f"unknown engine {engine!r}, expected 'agent' or 'fast'")
+        self.engine = engine
+        self.rng = np.random.default_rng(seed)
+        # per-phase timings of every step (see profiling.py); off unless asked for
+        self.profiler = StepProfiler() if profile else None
         self.num_ships = num_ships
-        # torus False means ships cannot travel to the other side of the grid
-        self.grid = MultiGrid(width, height, torus=False)
-        self.schedule = RandomActivation(self)
+        # land from a lat/lon GeoJSON coastline instead of the built-in regions
+        self.coastline = coastline
+        self.schedule = LivenessRandomActivation(self)
         self.running = True
         # initial numbers for docked and undocked
         self.docked_ships_count = 0
         self.undocked_ships_count = 0
+        # running totals for the datacollector, updated on spawn, exit, dock,
+        # undock and policy assignment so collecting never walks the agents
+        self.ship_count = 0
+        self.scrubber_ship_count = 0
+        self.total_port_revenue = 0
+        self.port_policy_counts = Counter()
+        # bumped by Port.set_policy
+        self.policy_version = 0
+        self._route_table_version = None
         
-        self.next_trail_id = 10000
+        # scrubber water discharged by ships; each trail holds 10 units for 60 steps
+        self.discharge = DischargeField(width, height, lifespan=60, water_units=10)
         
         self.initial_spawn_done = False
         # Extra environment settings
         self.ship_wait_time = ship_wait_time
+        # route weight of taxing ports for scrubber ships, and of subsidizing ports
+        # for the other ships, relative to allowing ports
+        self.tax_multiplier = tax_multiplier
+        self.subsidy_multiplier = subsidy_multiplier
         
         # initialize scrubber penalty accumulators
         self.scrubber_penalty_sum = 0
@@ -47,67 +158,22 @@ class ShipPortModel(Model):
         self.selected_policy = selected_policy
         
         # Process custom port policies mapping (e.g., "amsterdam:ban, rotterdam:ban, hamburg:ban, antwerp:ban, london:ban")
-        if custom_port_policies != "None":
-            self.custom_port_policies = {}
-            for pair in custom_port_policies.split(','):
-                if ':' in pair:
-                    port_name, policy = pair.split(':', 1)
-                    self.custom_port_policies[port_name.strip().lower()] = policy.strip()
-        else:
-            self.custom_port_policies = {}
-
-        #!DO NOT TRY TO CHANGE THIS WITHOUT ANDREY'S CONSENT CAUSE HE LOST HIS ABILITY TO SEE TRYING TO SET IT UP!
-        land_regions = [
-            # UK and islands
-            [(0, 0), (0,2), (26, 2), (26,0)], [(0,3), (0,5), (20,5), (20,3), (0,3)],
-            [(0,5),(0,24),(26,24),(32,14), (26,6),(0,6)], [(0,25),(20,25),(10,25),(0,25)],
-            [(0,26),(20,26),(10,26),(0,26)],[(0,27),(18,27),(10,27),(0,27)],
-            [(0, 28),(0,34), (18,34),(18,28),(0,28)],[(0, 34),(0,41), (10,41),(10,34),(0,34)],
-            [(11, 34),(11,38), (12,38),(12,34)],[(11, 39),(11,39), (11,39),(11,39)],
-            [(0, 42),(0,48), (10,41)], [(0, 52),(4,52), (4,52)], [(0, 56),(0,60), (6,60)],
-            [(0, 61),(0,68), (10,68), (5, 61)], [(8, 64),(8,65), (8,65)], [(9, 66),(9,65), (9,65)], 
-            [(0, 71),(0,76), (7, 76), (2, 71)], [(0, 80),(0,82), (2,82), (0, 80)], 
-            [(10, 89),(13, 95),(15,95),(10, 89)], [(10, 90),(10, 90), (10,90)],
-            
-            #France and NL
-            [(41, 0),(41,1), (46, 1),(47,0)], [(55, 0),(55, 5),(100,5), (100, 0)], 
-             [(57, 5),(57, 10),(100, 10), (100, 5)], [(56, 6),(56, 6), (56, 6)], 
-             [(59, 11),(59, 12),(100, 12), (100, 11)], [(51, 5),(51, 6),(54, 3)],
-             [(53, 10),(53, 13),(56, 10)], [(56, 11),(58, 11),(58, 11)],
-             [(63, 13),(71, 21),(71, 13)], [(72, 13),(72, 21),(79, 21), (82,13)], 
-             [(80, 19),(100, 19),(100, 12), (80,13)], [(72, 22),(79, 22),(79, 22)],
-             [(55, 15),(58, 15),(59, 15)], [(55, 16),(59, 23),(61, 17), (59,16)], 
-             [(59, 21),(60, 22), (60, 22)], [(66, 16),(68, 22,),(74, 22), (74,0)], 
-             [(75, 23),(78, 25),(78, 23)], [(86, 20),(86, 23),(100, 23), (100, 20)],
-             [(84, 23),(86, 23),(86, 23)], [(85, 24),(85, 27),(92, 23)], 
-             [(87, 30),(100, 30),(100, 27), (90, 27)], [(95, 27),(100, 27),(100, 24), (95,24)], 
-
-             #Denmark
-             [(87, 31),(89, 40),(100, 40), (100, 31)],[(89, 41),(87, 50),(97, 60), (100, 60), (100, 0)],
-             
-             #Norway and Sweden
-             [(60, 99),(100, 99),(100, 96), (60,96)], [(61, 95),(100, 95),(100, 95)],[(61, 91),(61, 95),(100, 95), (100,91)],
-             [(61, 84),(61, 90),(94, 90), (94, 84)], [(64, 81),(64, 84),(89, 84), (89, 81)],
-             [(70, 65),(64, 80),(94, 84), (80, 65)],[(95, 83), (95, 84), (95, 85)], [(96, 86), (95, 86), (97, 86)], 
-             [(96, 90), (95, 90), (95, 90)]
-            ]
-        
-        # using polygon to set the land regions 
-        self.land_polygons = [Polygon(region) for region in land_regions]
-        # adding land and water terrains 
-        for x in range(width):
-            for y in range(height):
-                #check if the point is within the polygon
-                point = Point(x, y)
-                #coverts method is used to color areas inside of the polygon
-                is_land = any(polygon.covers(point) for polygon in self.land_polygons)
-                terrain_type = 'land' if is_land else "water"
-                terrain = Terrain(f'terrain_{x}_{y}', self, terrain_type)
-                self.grid.place_agent(terrain, (x, y))
-                self.schedule.add(terrain)
+        self.custom_port_policies = parse_port_policies(custom_port_policies)
+
+        # static terrain, cells and navigation tables shared by every model of this
+        # size and coastline
+        self.world = World.get(width, height, coastline)
+        self.water = self.world.water
+        self.water_cells = self.world.water_cells
+        self.spawn_cells = self.world.spawn_cells
+        self.exit_cells = self.world.exit_cells
+        # ports and ships by cell, with the cell classes for move checks; not a
+        # torus, so ships cannot travel to the other side of the grid
+        self.grid = OccupancyGrid(width, height, self.world.cell_class)
         
         # Create port agents with potential custom policies.
-        for i, port_data in enumerate(Port.raw_port_data):
+        self.ports = []
+        for i, port_data in enumerate(load_port_table().rows()):
             # Check if a custom policy exists for this port (using lower-case names)
             port_policy_for_agent = None
             port_name_lc = port_data['name'].lower()
@@ -119,289 +185,288 @@ class ShipPortModel(Model):
                     port_policy_for_agent = selected_policy
             # Create the Port agent with the determined policy.
             port = Port(i, self, port_data, policy=port_policy_for_agent)
-            x, y = int(port_data['X']), int(port_data['Y'])
+            # the world's cell for the port, scaled or projected to this grid
+            x, y = self.world.port_cells[i].tolist()
             self.grid.place_agent(port, (x, y))
             self.schedule.add(port)
+            self.ports.append(port)
         
-        num_ports = len(Port.raw_port_data)
+        # distance fields over the water cells that ships can enter (no ports),
+        # one per port and one for the exit zone
+        self.passable = self.world.passable
+        self.attach_navigation()
+        
+        num_ports = len(self.ports)
         self.next_ship_id = num_ports
         self.remaining_ships = num_ships
         self.spawn_duration = 3
+        # ships that exited this step and still need a replacement
+        self.pending_replacements = 0
         
         # Initialize the datacollector.
-        self.datacollector = DataCollector(
+        self.datacollector = self.new_datacollector()
+        # per-port revenue and docking series, one column per port in self.ports order
+        self.port_recorder = PortRecorder([port.name.lower() for port in self.ports])
+        self.fleet = Fleet(self, num_ships) if engine == "fast" else None
+
+    def new_datacollector(self):
+        return DataCollector(
             model_reporters = {
-                "NumScrubberShips": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, Ship) and getattr(a, 'is_scrubber', False)),
-                "NumScrubberTrails": lambda m: sum(1 for a in m.schedule.agents if type(a) is ScrubberTrail),
-                "TotalScrubberWater": lambda m: sum(a.water_units for a in m.schedule.agents if type(a) is ScrubberTrail),
-                "NumShips": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, Ship)),
-                "TotalDockedShips": lambda m: sum(len(a.docked_ships) for a in m.schedule.agents if isinstance(a, Port)),
-                "AvgPortPopularity": lambda m: (sum(len(a.docked_ships) for a in m.schedule.agents if isinstance(a, Port)) 
-                                                / max(1, sum(1 for a in m.schedule.agents if isinstance(a, Port)))),
-                "NumPortsBan": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, Port) and  a.scrubber_policy == "ban"),
-                "NumPortsTax": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, Port) and  a.scrubber_policy == "tax"),
-                "NumPortsSubsidy": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, Port) and  a.scrubber_policy == "subsidy"),
-                "NumPortsAllow": lambda m: sum(1 for a in m.schedule.agents if isinstance(a, Port) and  a.scrubber_policy == "allow"),
-                "TotalPortRevenue": lambda m: sum(a.revenue for a in m.schedule.agents if isinstance(a, Port)),
-                "AvgPortRevenue": lambda m: (sum(a.revenue for a in m.schedule.agents if isinstance(a, Port)) 
-                                             / max(1, sum(1 for a in m.schedule.agents if isinstance(a, Port)))),
-                "PortRevenues": lambda m: {port.name.lower(): port.revenue
-                                            for port in m.schedule.agents if isinstance(port, Port)},
-                "PortDocking": lambda m: {port.name.lower(): len(port.docked_ships)
-                                          for port in m.schedule.agents if isinstance(port, Port)},
-                
+                "NumScrubberShips": lambda m: m.scrubber_ship_count,
+                "NumScrubberTrails": lambda m: m.discharge.num_trails(),
+                "TotalScrubberWater": lambda m: m.discharge.total_water(),
+                "NumShips": lambda m: m.ship_count,
+                "TotalDockedShips": lambda m: m.docked_ships_count,
+                "AvgPortPopularity": lambda m: m.docked_ships_count / max(1, len(m.ports)),
+                "NumPortsBan": lambda m: m.port_policy_counts["ban"],
+                "NumPortsTax": lambda m: m.port_policy_counts["tax"],
+                "NumPortsSubsidy": lambda m: m.port_policy_counts["subsidy"],
+                "NumPortsAllow": lambda m: m.port_policy_counts["allow"],
+                "TotalPortRevenue": lambda m: m.total_port_revenue,
+                "AvgPortRevenue": lambda m: m.total_port_revenue / max(1, len(m.ports)),
             }
         )
+
+    def __getstate__(self):
+        # the static world is reattached on restore and the datacollector's
+        # lambda reporters cannot be pickled, only its data is kept
+        state = self.__dict__.copy()
+        del state["world"], state["water"], state["water_cells"], state["spawn_cells"], state["exit_cells"]
+        del state["passable"], state["exit_field"], state["datacollector"]
+        state["collected_vars"] = self.datacollector.model_vars
+        return state
+
+    def __setstate__(self, state):
+        collected_vars = state.pop("collected_vars")
+        self.__dict__.update(state)
+        self.datacollector = self.new_datacollector()
+        self.datacollector.model_vars = collected_vars
+        self.world = World.get(self.grid.width, self.grid.height, self.coastline)
+        self.water = self.world.water
+        self.water_cells = self.world.water_cells
+        self.spawn_cells = self.world.spawn_cells
+        self.exit_cells = self.world.exit_cells
+        self.passable = self.world.passable
+        self.grid.cell_class = self.world.cell_class
+        self.attach_navigation()
+        if self.fleet is not None:
+            self.fleet.build_directions()
+
+    def attach_navigation(self):
+        # ports are created in port table order, like the world's port tables
+        for port, field in zip(self.ports, self.world.port_fields):
+            port.navigation_field = field
+        self.exit_field = self.world.exit_field
+
+    def save_checkpoint(self, path):
+        """
+        Writes the full model state (RNGs, ships, ports, discharge and the data
+        collected so far) to a compressed file that load_checkpoint restores.
+        """
+        with gzip.open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def fork(self, custom_port_policies=None):
+        """
+        An independent copy of the model in its current state, optionally with
+        new custom port policies applied. The copy continues with the same random
+        streams, so variants forked from one baseline are paired comparisons.
+        """
+        model = pickle.loads(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+        if custom_port_policies is not None:
+            model.apply_port_policies(custom_port_policies)
+        return model
+
+    def apply_port_policies(self, custom_port_policies):
+        """
+        Switches the named ports to new policies mid-run ("name:policy, ..."
+        like the custom_port_policies argument); other ports keep theirs.
+        Routes of ships spawned from now on are weighted by the new policies,
+        ships already at sea find out about a ban when they reach the port.
+        """
+        policies = parse_port_policies(custom_port_policies)
+        for port in self.ports:
+            policy = policies.get(port.name.lower())
+            if policy is not None and policy != port.scrubber_policy:
+                port.set_policy(policy)
+        self.custom_port_policies.update(policies)
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        """Rebuilds a model saved with save_checkpoint; stepping continues where it left off."""
+        with gzip.open(path, "rb") as f:
+            model = pickle.load(f)
+        if not isinstance(model, cls):
+            raise TypeError(f"{path} does not contain a {cls.__name__} checkpoint")
+        return model
         
     def get_average_penalty(self):
         if self.scrubber_penalty_count > 0:
             return self.scrubber_penalty_sum / self.scrubber_penalty_count
         return 0    
     
-    def spawn_ship(self, ship_id):
-        """Spawns a new Ship agent at a water cell."""
-        new_ship = Ship(ship_id, self)
-        # Determine spawn location
-        if not self.initial_spawn_done:
-            # Random water cell anywhere on the grid
-            water_cells = []
-            for x in range(self.grid.width):
-                for y in range(self.grid.height):
-                    cell_contents = self.grid.get_cell_list_contents((x, y))
-                    if any(isinstance(agent, Terrain) and agent.terrain_type == 'water' for agent in cell_contents):
-                        water_cells.append((x, y))
-            start_pos = self.random.choice(water_cells) if water_cells else (0, 0)
+    def remove_ship(self, ship, replace=False):
+        """
+        Takes a ship out of the grid and schedule and updates the ship counters.
+        With replace, a new ship is spawned in its place at the end of the step.
+        """
+        if ship.docked_port is not None:
+            ship.docked_port.undock_ship(ship)
+            ship.docked_port = None
+            ship.docked = False
+        self.grid.remove_agent(ship)
+        self.schedule.remove(ship)
+        self.ship_count -= 1
+        if ship.is_scrubber:
+            self.scrubber_ship_count -= 1
+        if replace:
+            self.pending_replacements += 1
+    
+    def random_cell(self, cells, default):
+        """Draws one cell from a precomputed (n, 2) cell array, or default if it is empty."""
+        if len(cells) == 0:
+            return default
+        x, y = cells[self.random.randrange(len(cells))]
+        return (int(x), int(y))
+    
+    def route_weight_table(self):
+        """
+        Weight of every port (in self.ports order) when picking a route, for
+        every ship class: table[type_index, is_scrubber, port_index], with
+        type_index into SHIP_TYPES. Rebuilt only when a port policy changes.
+        """
+        if self._route_table_version != self.policy_version:
+            popularity = np.array([base_popularity(port) for port in self.ports], dtype=float)
+            policies = np.array([port.scrubber_policy for port in self.ports], dtype=object)
+            # Adjust weights based on port policy and ship type.
+            scrubber = popularity.copy()
+            scrubber[policies == "ban"] = 0
+            scrubber[policies == "tax"] *= self.tax_multiplier  # reduce desirability for scrubber ships
+            non_scrubber = popularity.copy()
+            non_scrubber[policies == "subsidy"] *= self.subsidy_multiplier  # increase desirability for non-scrubber ships
+            factors = np.array([SHIP_TYPE_FACTORS.get(t, 1.0) for t in SHIP_TYPES])
+            self._route_table = factors[:, None, None] * np.stack([non_scrubber, scrubber])[None]
+            self._route_table_version = self.policy_version
+        return self._route_table
+
+    def sample_routes(self, type_index, is_scrubber, k=3):
+        """
+        Routes for a batch of new ships: an (n, min(k, num_ports)) array of
+        indices into self.ports, drawn by weight without replacement.
+        """
+        weights = self.route_weight_table()[np.asarray(type_index), np.asarray(is_scrubber, dtype=int)]
+        # Efraimidis-Spirakis: the k largest log(u) / w keys are a weighted
+        # sample without replacement; zero-weight ports come last, in port order
+        with np.errstate(divide="ignore"):
+            keys = np.log(self.rng.random(weights.shape)) / weights
+        keys[weights <= 0] = -np.inf
+        order = np.argsort(-keys, axis=1, kind="stable")
+        return order[:, :min(k, len(self.ports))]
+
+    def draw_new_ships(self, n):
+        """
+        Draws the type (index into SHIP_TYPES), scrubber flag, start cell and
+        route of n new ships in a few vectorized calls.
+        """
+        type_index = self.rng.choice(len(SHIP_TYPES), size=n, p=SHIP_TYPE_PROBABILITIES)
+        # adjust probability based on model's average scrubber penalty
+        adjusted = SHIP_SCRUBBER_PROBABILITIES[type_index] / (1 + self.get_average_penalty())
+        is_scrubber = self.rng.random(n) < adjusted
+        if not self.initial_spawn_done or len(self.spawn_cells) == 0:
+            # random water cell anywhere on the grid, or fallback when there is no channel
+            cells = self.water_cells
         else:
             # English Channel (bottom row, as before)
-            bottom_y = 0
-            x_range = min(38, self.grid.width)
-            possible_positions = []
-            for x in range(x_range):
-                pos = (x, bottom_y)
-                cell_contents = self.grid.get_cell_list_contents(pos)
-                if any(isinstance(agent, Terrain) and agent.terrain_type == 'water' for agent in cell_contents):
-                    possible_positions.append(pos)
-            if possible_positions:
-                start_pos = self.random.choice(possible_positions)
-            else:
-                # fallback: choose any water cell in grid.
-                water_cells = []
-                for x in range(self.grid.width):
-                    for y in range(self.grid.height):
-                        cell_contents = self.grid.get_cell_list_contents((x, y))
-                        if any(isinstance(agent, Terrain) and agent.terrain_type == 'water' for agent in cell_contents):
-                            water_cells.append((x, y))
-                start_pos = self.random.choice(water_cells) if water_cells else (0, bottom_y)
-        self.grid.place_agent(new_ship, start_pos)
-        self.schedule.add(new_ship)
-        
-        # determine ship route based on ship type and port popularity
-        ports = [agent for agent in self.schedule.agents if isinstance(agent, Port)]
-        if ports:
-            # base port popularity (based on empirical data)
-            def base_popularity(port):
-                port_name = port.name.lower()
-                if port_name == "rotterdam":
-                    return 8
-                elif port_name == "antwerp":
-                    return 5
-                elif port_name in ["amsterdam", "hamburg"]:
-                    return 2
-                else:
-                    return 1
-                
-            # ship type specific factors
-            # higher number means they prefer busier ports
-            # might need tuning to match empirical data
-            ship_type_factors = {
-                "cargo": 1.0,
-                "tanker": 1.0,
-                "fishing": 0.8,
-                "other": 0.8,
-                "tug": 0.5,
-                "passenger": 1.2,
-                "hsc": 1.2,
-                "dredging": 0.6,
-                "search": 0.7 
-            }
-            factor = ship_type_factors.get(new_ship.ship_type, 1.0)
-            # weighted list of routes to choose from
-            agent_weights = []
-            for port in ports:
-                weight = base_popularity(port)
-                # Adjust weights based on port policy and ship type.
-                if port.scrubber_policy == 'ban' and new_ship.is_scrubber:
-                    weight = 0
-                elif port.scrubber_policy == 'tax' and new_ship.is_scrubber:
-                    weight *= 0.5  # reduce desirability for scrubber ships
-                elif port.scrubber_policy == 'subsidy' and not new_ship.is_scrubber:
-                    weight *= 1.5  # increase desirability for non-scrubber ships
-                agent_weights.append(weight * factor)
-            # algorithm for weighted sampling without replacement
-            def weighted_random_sampling(agents, weights, k):
-                selected = []
-                agents_copy = agents[:]
-                weights_copy = weights[:]
-                for _ in range(k):
-                    total = sum(weights_copy)
-                    r = self.random.random() * total
-                    upto = 0
-                    for idx, w in enumerate(weights_copy):
-                        upto += w
-                        if upto >= r:
-                            selected.append(agents_copy.pop(idx))
-                            weights_copy.pop(idx)
-                            break
-                return selected
-            # we need to figure out how many ports ships typically visit (3 has been chosen arbitrarily)
-            new_ship.route = weighted_random_sampling(ports, agent_weights, 3)
-        return new_ship
-            
+            cells = self.spawn_cells
+        if len(cells) > 0:
+            start = cells[self.rng.integers(len(cells), size=n)]
+        else:
+            start = np.zeros((n, 2), dtype=int)
+        # determine ship routes based on ship type and port popularity
+        routes = self.sample_routes(type_index, is_scrubber)
+        return type_index, is_scrubber, start, routes
 
-    def step(self):
+    def spawn_ships(self, n):
+        """Spawns n new Ship agents at water cells and returns them."""
+        type_index, is_scrubber, start, routes = self.draw_new_ships(n)
+        ships = []
+        for i, (t, scrubber, pos, route) in enumerate(zip(type_index.tolist(), is_scrubber.tolist(),
+                                                          start.tolist(), routes.tolist())):
+            ship = Ship(self.next_ship_id + i, self, ship_type=SHIP_TYPES[t], is_scrubber=scrubber)
+            ship.route = [self.ports[p] for p in route]
+            self.grid.place_agent(ship, tuple(pos))
+            ships.append(ship)
+        self.schedule.add_many(ships)
+        self.next_ship_id += n
+        self.ship_count += n
+        self.scrubber_ship_count += int(is_scrubber.sum())
+        return ships
+
+    def spawn_initial_ships(self):
         """
-        Step method: gradually spawn ships during initial time steps
+        Gradually spawn the fleet during the initial time steps.
         """
         current_step = self.schedule.steps
         if current_step < self.spawn_duration and self.remaining_ships > 0:
             spawn_rate = math.ceil(self.remaining_ships / (self.spawn_duration - current_step))
-            for _ in range(spawn_rate):
-                if self.remaining_ships <= 0:
-                    break
-                self.spawn_ship(self.next_ship_id)
-                self.next_ship_id += 1
-                self.remaining_ships -= 1
+            spawn_rate = min(spawn_rate, self.remaining_ships)
+            if self.fleet is not None:
+                self.fleet.spawn(spawn_rate)
+            else:
+                self.spawn_ships(spawn_rate)
+            self.remaining_ships -= spawn_rate
             if self.remaining_ships <= 0:
                 self.initial_spawn_done = True  # Set flag after initial spawn
-        self.schedule.step()
-        self.datacollector.collect(self)
 
-    def lat_lon_to_grid(self, lat, lon):
+    def replace_exited_ships(self):
+        if self.pending_replacements:
+            # replace the ships that left during this step in one batch
+            self.spawn_ships(self.pending_replacements)
+            self.pending_replacements = 0
+
+    def record_ports(self):
+        self.port_recorder.record([port.revenue for port in self.ports],
+                                  [port.current_capacity for port in self.ports])
+
+    def step_phases(self):
         """
-        Convert lat/lon to grid coordinates
+        The phases of one step in order, as (name, function) pairs.
         """
-        x = int(((lon - self.min_lon) / (self.max_lon - self.min_lon)) * (self.grid.width - 1))
-        y = int(((lat - self.min_lat) / (self.max_lat - self.min_lat)) * (self.grid.height - 1))
-        return (x, y)
-
-def agent_portrayal(agent):
-    if isinstance(agent, Port):
-        if agent.scrubber_policy == "ban":
-            color = "black"
-        elif agent.scrubber_policy == "tax":
-            color = "orange"
-        elif agent.scrubber_policy == "subsidy":
-            color = "green"
-        else:
-            color = "brown"
-        grid_port_size = 2 if agent.port_capacity == 5 else 3
-        return {
-            "Shape": "rect", 
-            "Color": color, 
-            "Filled": "true", 
-            "Layer":1,
-            "w": grid_port_size, 
-            "h": grid_port_size,
-            "port_name": agent.name,
-            "text_color": "white",
-            "max_capacity": agent.port_capacity,
-            "current_capacity": agent.current_capacity 
-        }
-    elif isinstance(agent, Ship):
-        # Define color mapping for each ship type.
-        ship_colors = {
-            "cargo": "blue",
-            "tanker": "navy",
-            "fishing": "yellow",
-            "other": "gray",
-            "tug": "orange",
-            "passenger": "pink",
-            "hsc": "purple",
-            "dredging": "brown",
-            "search": "green"
-        }
-        # Select color based on ship type.
-        color = ship_colors.get(agent.ship_type, "green")
-        # Optional override: if the ship is a scrubber then color it red.
-        if agent.is_scrubber:
-            color = "red"
-        return {
-            "Shape": "circle", 
-            "Color": color, 
-            "Filled": "true", 
-            "Layer": 1,
-            "r": 1
-        }
-    elif isinstance(agent, ScrubberTrail):
-        return {
-            "Shape": "circle", 
-            "Color": "orange", 
-            "Filled": "true", 
-            "Layer": 0,
-            "r": 0.5
-        }
-    elif isinstance(agent, Terrain):
-        if agent.terrain_type == 'water':
-            return {
-                "Shape": "rect", 
-                "Color": "lightblue", 
-                "Filled": "true", 
-                "Layer": 0, 
-                "w": 1, 
-                "h": 1
-            }
-        else:
-            return {
-                "Shape": "rect", 
-                "Color": "silver", 
-                "Filled": "true", 
-                "Layer": 0, 
-                "w": 1, 
-                "h": 1
-            }
+        phases = [
+            ("spawn", self.spawn_initial_ships),
+            # drop trails that reached their lifespan before ships discharge new ones
+            ("discharge", self.discharge.step),
+            ("agents", self.schedule.step),
+        ]
+        if self.fleet is not None:
+            phases.append(("fleet", self.fleet.step))
+        phases += [
+            ("replace", self.replace_exited_ships),
+            ("collect", lambda: self.datacollector.collect(self)),
+            ("record", self.record_ports),
+        ]
+        return phases
 
-# Create port name list for dropdown menu
-def get_port_names():
-    port_names = []
-    for port_data in Port.raw_port_data:
-        port_names.append(port_data["name"])
-    return port_names
+    def step(self):
+        """
+        Step method: runs the step phases, timed per phase when profiling.
+        """
+        if self.profiler is not None:
+            self.profiler.step(self)
+            return
+        for _, phase in self.step_phases():
+            phase()
 
+    def profile_frame(self):
+        """Per-step phase timings and helper call counts; requires profile=True."""
+        if self.profiler is None:
+            raise RuntimeError("the model was created without profile=True")
+        return self.profiler.frame()
 
-if __name__ == "__main__":
-    # grid set up
-    grid = CanvasGrid(agent_portrayal, 100, 100, 500, 500)
-    
-    # Get available port names for dropdown
-    port_names = []
-    with open('filtered_ports_with_x_y.csv', 'r') as port_data:
-        open_port = csv.DictReader(port_data)
-        for row in open_port:
-            port_names.append(row["PORT_NAME"])
-
-    # Define the model parameters that can be set by the user
-    model_params = {
-        'width': 100,
-        'height': 100,
-        'num_ships': Slider("Number of Ships", 50, 10, 200, 10),
-        'ship_wait_time': Slider("Ship Wait Time", 100, 10, 200, 10),
-        'port_policy': UserSettableParameter('choice', 'Default Port Policy', 
-                                           value='allow',
-                                           choices=['allow', 'ban', 'tax', 'subsidy']),
-        'selected_port': UserSettableParameter('choice', 'Select Port to Configure', 
-                                             value="None",
-                                             choices=["None"] + port_names),
-        'selected_policy': UserSettableParameter('choice', 'Policy for Selected Port', 
-                                               value="None",
-                                               choices=["None", 'allow', 'ban', 'tax', 'subsidy'])
-    }
-
-    server = ModularServer(
-        ShipPortModel, 
-        [grid], 
-        'North Sea Watch',
-        model_params
-    )
-    
-    server.port = 8521  # example port
-    server.launch()
\ No newline at end of file
+    def lat_lon_to_grid(self, lat, lon):
+        """
+        Convert lat/lon to grid coordinates, with the projection the world
+        placed the ports and coastline with
+        """
+        x, y = self.world.projection.to_grid(lat, lon)
+        return (int(x), int(y))
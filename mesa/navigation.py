@@ -0,0 +1,113 @@
+"""
+Sea-distance fields for ship navigation.
+
+For every target (a port, or the exit zone in the English Channel) a
+breadth-first distance over the passable water cells is computed once, and
+each cell stores the Moore step that goes downhill on it. Moving a ship is
+then a single lookup, and a ship on a reachable cell always arrives.
+"""
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# Moore neighbourhood offsets, indexed by the direction codes stored in a field
+OFFSETS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)], dtype=np.int8)
+# direction codes besides the offsets
+AT_TARGET = 8
+UNREACHABLE = -1
+
+
+class NavigationField:
+    """
+    Distance to a set of target cells and the downhill step from every cell.
+    """
+    def __init__(self, distance, direction):
+        self.distance = distance
+        self.direction = direction
+
+    def at_target(self, pos):
+        return self.direction[pos] == AT_TARGET
+
+    def next_step(self, pos):
+        """
+        The next cell on a shortest path from pos, pos itself when it is a
+        target cell, or None when no target can be reached from pos.
+        """
+        code = self.direction[pos]
+        if code == UNREACHABLE:
+            return None
+        if code == AT_TARGET:
+            return pos
+        dx, dy = OFFSETS[code]
+        return (pos[0] + int(dx), pos[1] + int(dy))
+
+
+class Navigation:
+    """
+    Navigation fields over one passable mask (water cells without ports),
+    computed on first use. The World keeps the fields its models share.
+    With keep_distance=False fields only hold their directions, which keeps
+    memory down on large grids.
+    """
+    def __init__(self, passable, keep_distance=True):
+        self.passable = passable
+        self.keep_distance = keep_distance
+        self.width, self.height = passable.shape
+        self._graph = None
+        self._fields = {}
+
+    def _build_graph(self):
+        # one unit-cost edge between every pair of passable Moore neighbours
+        index = np.arange(self.width * self.height).reshape(self.width, self.height)
+        rows, cols = [], []
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (1, -1)):
+            src = (slice(0, self.width - dx), slice(max(0, -dy), self.height - max(0, dy)))
+            dst = (slice(dx, self.width), slice(max(0, dy), self.height - max(0, -dy)))
+            both = self.passable[src] & self.passable[dst]
+            rows.append(index[src][both])
+            cols.append(index[dst][both])
+        rows = np.concatenate(rows)
+        cols = np.concatenate(cols)
+        size = self.width * self.height
+        return coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(size, size)).tocsr()
+
+    def field(self, key, targets):
+        """
+        The field toward the given target cells, cached under key.
+        Targets that are not passable are ignored.
+        """
+        if key in self._fields:
+            return self._fields[key]
+        if self._graph is None:
+            self._graph = self._build_graph()
+        targets = [(x, y) for x, y in targets if self.passable[x, y]]
+        distance = np.full((self.width, self.height), np.inf)
+        if targets:
+            sources = [x * self.height + y for x, y in targets]
+            distance = dijkstra(self._graph, directed=False, indices=sources, min_only=True)
+            distance = distance.reshape(self.width, self.height)
+            distance[~self.passable] = np.inf
+        field = NavigationField(distance if self.keep_distance else None, self._directions(distance))
+        self._fields[key] = field
+        return field
+
+    def _directions(self, distance):
+        # distance of every Moore neighbour, stacked in OFFSETS order
+        padded = np.pad(distance, 1, constant_values=np.inf)
+        neighbours = np.stack([padded[1 + dx:1 + dx + self.width, 1 + dy:1 + dy + self.height]
+                               for dx, dy in OFFSETS.tolist()])
+        direction = np.argmin(neighbours, axis=0).astype(np.int8)
+        direction[distance == 0] = AT_TARGET
+        direction[np.isinf(distance)] = UNREACHABLE
+        return direction
+
+    def port_field(self, pos):
+        """Field toward the cells from which a ship can dock at a port at pos."""
+        x, y = pos
+        targets = [(x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                   if 0 <= x + dx < self.width and 0 <= y + dy < self.height]
+        return self.field(("port", x, y), targets)
+
+    def exit_field(self, exit_cells):
+        """Field toward the exit zone."""
+        return self.field("exit", [tuple(cell) for cell in exit_cells.tolist()])
@@ -0,0 +1,101 @@
+"""
+Spatial index of the ShipPortModel grid.
+
+Replaces mesa's MultiGrid, which keeps a Python list in every cell and made
+every move check walk a cell's agents with isinstance. Here the static part
+of a cell (land, water or port) is a lookup in an int array shared through
+the World, and agents are only kept for the cells that hold any, so checking
+a move is an array lookup and an empty 1000x1000 grid costs nothing.
+"""
+import numpy as np
+
+# cell classes
+LAND = 0
+WATER = 1
+PORT = 2
+
+
+def cell_classes(water, port_cells):
+    """Cell class of every cell (indexed as classes[x, y]) from the water mask and port cells."""
+    classes = np.where(water, WATER, LAND).astype(np.int8)
+    classes[port_cells[:, 0], port_cells[:, 1]] = PORT
+    return classes
+
+
+class OccupancyGrid:
+    """
+    Non-toroidal grid with the parts of mesa's grid API the model, the ships
+    and the visualization use, plus open_neighbors for move checks.
+    """
+    def __init__(self, width, height, cell_class):
+        self.width = width
+        self.height = height
+        self.torus = False
+        # static cell classes, shared by every model of the world
+        self.cell_class = cell_class
+        # (x, y) -> agents in that cell, for occupied cells only
+        self._agents = {}
+
+    def __getstate__(self):
+        # the cell classes belong to the World and are reattached by the model on restore
+        state = self.__dict__.copy()
+        state["cell_class"] = None
+        return state
+
+    def out_of_bounds(self, pos):
+        x, y = pos
+        return x < 0 or x >= self.width or y < 0 or y >= self.height
+
+    def is_open(self, pos):
+        """True if ships can enter the cell: water without a port."""
+        return self.cell_class[pos] == WATER
+
+    def place_agent(self, agent, pos):
+        self._agents.setdefault(pos, []).append(agent)
+        agent.pos = pos
+
+    def remove_agent(self, agent):
+        pos = agent.pos
+        agents = self._agents[pos]
+        agents.remove(agent)
+        if not agents:
+            del self._agents[pos]
+        agent.pos = None
+
+    def move_agent(self, agent, pos):
+        self.remove_agent(agent)
+        self.place_agent(agent, pos)
+
+    def is_cell_empty(self, pos):
+        return pos not in self._agents
+
+    def count(self, pos):
+        """Number of agents in the cell."""
+        return len(self._agents.get(pos, ()))
+
+    def get_cell_list_contents(self, cell_list):
+        """Agents in a cell, or in a list of cells."""
+        if isinstance(cell_list, tuple):
+            cell_list = [cell_list]
+        return [agent for pos in cell_list for agent in self._agents.get(pos, ())]
+
+    def get_neighborhood(self, pos, moore=True, include_center=False, radius=1):
+        """Cells around pos, in the same order as mesa's grids."""
+        x, y = pos
+        neighborhood = []
+        for nx in range(max(0, x - radius), min(self.width, x + radius + 1)):
+            for ny in range(max(0, y - radius), min(self.height, y + radius + 1)):
+                if not moore and abs(nx - x) + abs(ny - y) > radius:
+                    continue
+                if not include_center and nx == x and ny == y:
+                    continue
+                neighborhood.append((nx, ny))
+        return neighborhood
+
+    def open_neighbors(self, pos):
+        """The Moore neighbours of pos that ships can enter, in get_neighborhood order."""
+        x, y = pos
+        x0, y0 = max(0, x - 1), max(0, y - 1)
+        window = self.cell_class[x0:x + 2, y0:y + 2] == WATER
+        window[x - x0, y - y0] = False
+        return [(x0 + dx, y0 + dy) for dx, dy in np.argwhere(window).tolist()]
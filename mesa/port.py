@@ -1,34 +1,12 @@
-from mesa import Agent, Model
-from mesa.time import RandomActivation
-from mesa.space import MultiGrid
-#leave this import for now for future data collection and visualization
-from mesa.datacollection import DataCollector
-from mesa.visualization.modules import CanvasGrid
-from mesa.visualization.ModularVisualization import ModularServer
-import csv
+from mesa import Agent
+from port_table import load_port_table
 
 
 class Port(Agent):
     """
     A port agent in the North Sea simulation -static.
-    
+    Port information comes from the port table (see port_table.py).
     """
-    #variable to store all port data
-    raw_port_data = []
-    # loading port information from filtered_port.csv
-    with open('filtered_ports_with_x_y.csv', 'r') as port_data:
-        open_port = csv.DictReader(port_data)
-        for row in open_port:
-            raw_port_data.append({
-                "id": int(row["INDEX_NO"]),
-                "name": row["PORT_NAME"],
-                "lat": float(row["LATITUDE"]),
-                "lon": float(row["LONGITUDE"]),
-                "capacity": row["HARBORSIZE"],
-                'X': row['X'],
-                'Y': row['Y']
-            })
-    
     #using information from parent class Agent (unique_id and model)
     def __init__(self, unique_id, model, port_data, policy=None):
         super().__init__(unique_id, model)
@@ -39,20 +17,20 @@ class Port(Agent):
         self.lon = port_data["lon"]
         self.port_capacity = self.port_size(port_data["capacity"])
         self.current_capacity = 0
-        self.docked_ships = []
+        self.docked_ships = set()
         # Set the scrubber policy based on the provided parameter or model's default
-        if policy is not None:
-            self.scrubber_policy = policy
-        else:
+        self.scrubber_policy = None
+        if policy is None:
             # If there's a default policy in the model, use that
             if model.port_policy and len(model.port_policy) > 0:
-                self.scrubber_policy = model.random.choice(model.port_policy)
+                policy = model.random.choice(model.port_policy)
             else:
-                self.scrubber_policy = "allow"  # Default fallback
-                
-        self.allow_scrubber = self.scrubber_policy != "ban"
+                policy = "allow"  # Default fallback
+        self.set_policy(policy)
 
         self.revenue = 0
+        # distance field ships follow to reach this port, set by the model
+        self.navigation_field = None
         
         # base fees for differnet ship types (needs empirical backing)
         self.base_fees = {
@@ -67,6 +45,24 @@ class Port(Agent):
             "search": 20
         }
 
+    def __getstate__(self):
+        # the navigation field is shared between models and rebuilt by the model on restore
+        state = self.__dict__.copy()
+        state["navigation_field"] = None
+        return state
+
+    def set_policy(self, policy):
+        """
+        Set the scrubber policy of this port and keep the model's policy counts in sync.
+        """
+        if self.scrubber_policy is not None:
+            self.model.port_policy_counts[self.scrubber_policy] -= 1
+        self.scrubber_policy = policy
+        self.allow_scrubber = policy != "ban"
+        self.model.port_policy_counts[policy] += 1
+        # lets caches of per-port policy data notice the change
+        self.model.policy_version += 1
+
     def port_size(self, capacity):
         """
         Transformation of port capacity from categorical into int.
@@ -79,7 +75,7 @@ class Port(Agent):
         else:
             base_capacity = 3
         # Scale base capacity by the ratio of total ships to number of ports
-        num_ports = len(Port.raw_port_data)
+        num_ports = len(load_port_table())
         # Assume self.model.num_ships is available from model parameters
         scaling_factor = self.model.num_ships / num_ports
         scaled_capacity = int(base_capacity * scaling_factor)
@@ -112,19 +108,22 @@ class Port(Agent):
             fee = self.calculate_docking_fee(ship)
             self.revenue += fee
             self.current_capacity += 1
-            self.docked_ships.append(ship)
+            self.docked_ships.add(ship)
+            self.model.total_port_revenue += fee
+            self.model.docked_ships_count += 1
             # print(f"Port {self.name}: Ship {ship.unique_id} docked, fee charged: {fee:.2f}, total revenue: {self.revenue:.2f}")
             return True
         return False
     
     def undock_ship(self, ship):
         """
-        Remove a ship from the port(list) when it leaves.
+        Remove a ship from the port(set) when it leaves.
         Returns True if undocking was successful, False otherwise.
         """
         if ship in self.docked_ships:
             self.docked_ships.remove(ship)
             self.current_capacity -= 1
+            self.model.docked_ships_count -= 1
             return True
         return False
     
@@ -0,0 +1,102 @@
+"""
+The port table (filtered_ports_with_x_y.csv) as typed columns.
+
+The CSV is parsed on first use, relative to this package rather than the
+current directory, and a binary copy is kept next to it so later processes
+load it without parsing. Every consumer (models, the world, the visualization
+and the experiments' port -> country mapping) reads the same table.
+"""
+import csv
+import os
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PORT_CSV = os.path.join(BASE_DIR, "filtered_ports_with_x_y.csv")
+
+# column name -> (CSV column, dtype)
+COLUMNS = {
+    "ids": ("INDEX_NO", np.int32),
+    "names": ("PORT_NAME", str),
+    "countries": ("COUNTRY", str),
+    "lat": ("LATITUDE", np.float64),
+    "lon": ("LONGITUDE", np.float64),
+    # harbor size class, e.g. "S", "M" or "L"
+    "capacity": ("HARBORSIZE", str),
+    "x": ("X", np.int32),
+    "y": ("Y", np.int32),
+}
+
+_tables = {}
+
+
+class PortTable:
+    """
+    One array per column, all in CSV row order (which is also the order of
+    model.ports).
+    """
+    def __init__(self, columns):
+        for name in COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self):
+        """One dict per port with the keys Port expects."""
+        return [{"id": int(i), "name": str(name), "lat": float(lat), "lon": float(lon),
+                 "capacity": str(capacity), "X": int(x), "Y": int(y)}
+                for i, name, lat, lon, capacity, x, y in zip(self.ids, self.names, self.lat, self.lon,
+                                                             self.capacity, self.x, self.y)]
+
+    def port_to_country(self):
+        """Port name (lower case) -> country code."""
+        return {str(name).lower(): str(country).upper() for name, country in zip(self.names, self.countries)}
+
+
+def parse_port_csv(path):
+    """Reads the port CSV into typed column arrays."""
+    values = {name: [] for name in COLUMNS}
+    with open(path, "r") as f:
+        for row in csv.DictReader(f):
+            for name, (column, dtype) in COLUMNS.items():
+                value = row[column].strip()
+                values[name].append(value if dtype is str else float(value))
+    columns = {}
+    for name, (_, dtype) in COLUMNS.items():
+        if dtype is str:
+            columns[name] = np.array(values[name], dtype=str)
+        else:
+            columns[name] = np.array(values[name]).astype(dtype)
+    return columns
+
+
+def load_port_table(path=PORT_CSV):
+    """
+    The port table for the CSV at path, parsed once per process and cached
+    on disk as <path>.npz (when the directory is writable), which is refreshed
+    whenever the CSV changes.
+    """
+    if path in _tables:
+        return _tables[path]
+    stat = os.stat(path)
+    source = np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+    cache_path = path + ".npz"
+    columns = None
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if np.array_equal(cached["source"], source):
+                columns = {name: cached[name] for name in COLUMNS}
+    if columns is None:
+        columns = parse_port_csv(path)
+        # write to a temporary file first so parallel workers never read a partial table
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, source=source, **columns)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # the cache is only an optimisation; read-only checkouts parse every time
+            pass
+    _tables[path] = PortTable(columns)
+    return _tables[path]
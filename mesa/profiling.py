@@ -0,0 +1,97 @@
+"""
+Optional per-phase timing of ShipPortModel steps.
+
+A model created with profile=True hands every step to a StepProfiler, which
+runs the same phases as ShipPortModel.step but times each of them, the agent
+steps per agent type, every datacollector reporter, and counts the calls of
+hot helpers. Models without a profiler never touch this module's code, so
+profiling costs nothing when it is off.
+"""
+import time
+
+import pandas as pd
+
+from ship import Ship
+
+# (owner, attribute) of helpers whose calls are counted while agents step
+COUNTED_HELPERS = (
+    ("ship", "is_valid_move"),
+    ("grid", "open_neighbors"),
+    ("grid", "get_neighborhood"),
+    ("grid", "move_agent"),
+)
+
+
+class StepProfiler:
+    """
+    Records one row per step: seconds per phase ("phase:<name>"), per agent type
+    ("agents:<type>"), per reporter ("reporter:<name>"), and helper call counts
+    ("calls:<helper>").
+    """
+    def __init__(self):
+        self.rows = []
+
+    def step(self, model):
+        row = {}
+        counts = {name: 0 for _, name in COUNTED_HELPERS}
+        for name, phase in model.step_phases():
+            start = time.perf_counter()
+            if name == "agents":
+                self._step_agents(model, row, counts)
+            elif name == "collect":
+                self._collect(model, row)
+            else:
+                phase()
+            row[f"phase:{name}"] = time.perf_counter() - start
+        for helper, count in counts.items():
+            row[f"calls:{helper}"] = count
+        self.rows.append(row)
+
+    def _step_agents(self, model, row, counts):
+        # same as RandomActivation.step, timing each agent by its type, with the
+        # counted helpers wrapped only for the duration of the phase
+        restore = self._count_helpers(model, counts)
+        try:
+            schedule = model.schedule
+            for agent in schedule.agent_buffer(shuffled=True):
+                start = time.perf_counter()
+                agent.step()
+                key = f"agents:{type(agent).__name__}"
+                row[key] = row.get(key, 0) + time.perf_counter() - start
+            schedule.steps += 1
+            schedule.time += 1
+        finally:
+            restore()
+
+    def _count_helpers(self, model, counts):
+        originals = []
+        for owner, name in COUNTED_HELPERS:
+            target = Ship if owner == "ship" else model.grid
+            original = target.__dict__.get(name)
+            func = getattr(target, name)
+
+            def counted(*args, _name=name, _func=func, **kwargs):
+                counts[_name] += 1
+                return _func(*args, **kwargs)
+            setattr(target, name, counted)
+            originals.append((target, name, original))
+
+        def restore():
+            for target, name, original in originals:
+                if target is Ship:
+                    setattr(target, name, original)
+                else:
+                    delattr(target, name)
+        return restore
+
+    def _collect(self, model, row):
+        # same as DataCollector.collect for the model's (function) reporters
+        collector = model.datacollector
+        for var, reporter in collector.model_reporters.items():
+            start = time.perf_counter()
+            collector.model_vars[var].append(reporter(model))
+            row[f"reporter:{var}"] = time.perf_counter() - start
+
+    def frame(self):
+        """The recorded rows as a DataFrame indexed by step."""
+        return pd.DataFrame(self.rows).fillna(0)
@@ -0,0 +1,57 @@
+"""
+Columnar recording of ShipPortModel's per-port time series.
+
+Replaces the dict-valued PortRevenues and PortDocking reporters: the recorder
+keeps one column per port, and the datacollector only records the model-wide
+totals.
+"""
+import numpy as np
+import pandas as pd
+
+
+class PortRecorder:
+    """
+    Per-port time series of revenue and number of docked ships.
+
+    Values are written into preallocated (steps x ports) arrays with a fixed
+    port order, so recording a step is two row copies and the series can be
+    handed out as wide tables without unpacking per-step dicts.
+    """
+    def __init__(self, port_names, capacity=1000):
+        self.port_names = list(port_names)
+        self.port_index = {name: i for i, name in enumerate(self.port_names)}
+        self.num_steps = 0
+        capacity = max(1, capacity)
+        self.revenue = np.zeros((capacity, len(self.port_names)))
+        self.docked = np.zeros((capacity, len(self.port_names)), dtype=np.int32)
+
+    def _grow(self):
+        # double the number of rows once the preallocated steps run out
+        self.revenue = np.vstack([self.revenue, np.zeros_like(self.revenue)])
+        self.docked = np.vstack([self.docked, np.zeros_like(self.docked)])
+
+    def record(self, revenue, docked):
+        """Store one step of revenue and docked ships, both in port order."""
+        if self.num_steps == self.revenue.shape[0]:
+            self._grow()
+        self.revenue[self.num_steps] = revenue
+        self.docked[self.num_steps] = docked
+        self.num_steps += 1
+
+    def _frame(self, values):
+        return pd.DataFrame(values[:self.num_steps], columns=self.port_names)
+
+    def revenue_frame(self):
+        """Cumulative revenue per port, one row per step and one column per port."""
+        return self._frame(self.revenue)
+
+    def docking_frame(self):
+        """Docked ships per port, one row per step and one column per port."""
+        return self._frame(self.docked)
+
+    def to_arrow(self, values="revenue"):
+        """The revenue or docking series as a wide pyarrow Table."""
+        import pyarrow as pa
+        data = self.revenue if values == "revenue" else self.docked
+        data = data[:self.num_steps]
+        return pa.table({name: data[:, i] for i, name in enumerate(self.port_names)})
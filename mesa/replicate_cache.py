@@ -0,0 +1,78 @@
+"""
+On-disk cache of experiment replicates.
+
+A replicate is fully determined by the model parameters (including
+custom_port_policies and the coastline file's contents), the number of steps,
+the seed and the simulation code, so its collected output is stored under a
+hash of exactly those. Rerunning a scenario, replotting it or adding
+replicates only simulates the missing ones.
+Changing any of the model sources changes the code version and misses the
+cache.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, "cache", "replicates")
+
+# files whose contents decide what a replicate produces
+CODE_FILES = ("mesa_model.py", "ship.py", "port.py", "fleet.py", "navigation.py", "discharge.py", "occupancy.py",
+              "recorder.py", "terrain.py", "world.py",
+              "port_table.py", "filtered_ports_with_x_y.csv")
+
+_code_version = None
+
+
+def code_version():
+    """Hash of the simulation sources, computed once per process."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha1()
+        for name in CODE_FILES:
+            digest.update(name.encode())
+            with open(os.path.join(BASE_DIR, name), "rb") as f:
+                digest.update(f.read())
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def file_digest(path):
+    """Hash of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def replicate_key(model_params, num_steps, seed):
+    """
+    Key of one replicate: hash of the model parameters, steps, seed and code
+    version, plus the contents of the coastline file if there is one, since
+    the parameters only name its path.
+    """
+    coastline = model_params.get("coastline")
+    payload = json.dumps({"params": model_params, "num_steps": num_steps, "seed": seed,
+                          "code": code_version(),
+                          "coastline": file_digest(coastline) if coastline else None}, sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_replicate(key, cache_dir=CACHE_DIR):
+    """The cached result stored under key, or None."""
+    path = os.path.join(cache_dir, key + ".pkl")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_replicate(key, result, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ".pkl")
+    # write to a temporary file first so concurrent runs never read a partial result
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
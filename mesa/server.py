@@ -0,0 +1,155 @@
+"""
+Browser visualization of the North Sea simulation.
+
+Run this file to start the Mesa server. The simulation modules do not import
+the visualization stack, so headless runs (experiments, workers) never pay
+for it; it is only loaded here.
+"""
+import numpy as np
+from mesa.visualization.modules import CanvasGrid
+from mesa.visualization.ModularVisualization import ModularServer
+from mesa.visualization.UserParam import UserSettableParameter, Slider
+
+from mesa_model import ShipPortModel
+from port import Port
+from port_table import load_port_table
+from ship import Ship
+
+
+def agent_portrayal(agent):
+    if isinstance(agent, Port):
+        if agent.scrubber_policy == "ban":
+            color = "black"
+        elif agent.scrubber_policy == "tax":
+            color = "orange"
+        elif agent.scrubber_policy == "subsidy":
+            color = "green"
+        else:
+            color = "brown"
+        grid_port_size = 2 if agent.port_capacity == 5 else 3
+        return {
+            "Shape": "rect", 
+            "Color": color, 
+            "Filled": "true", 
+            "Layer":1,
+            "w": grid_port_size, 
+            "h": grid_port_size,
+            "port_name": agent.name,
+            "text_color": "white",
+            "max_capacity": agent.port_capacity,
+            "current_capacity": agent.current_capacity 
+        }
+    elif isinstance(agent, Ship):
+        # Define color mapping for each ship type.
+        ship_colors = {
+            "cargo": "blue",
+            "tanker": "navy",
+            "fishing": "yellow",
+            "other": "gray",
+            "tug": "orange",
+            "passenger": "pink",
+            "hsc": "purple",
+            "dredging": "brown",
+            "search": "green"
+        }
+        # Select color based on ship type.
+        color = ship_colors.get(agent.ship_type, "green")
+        # Optional override: if the ship is a scrubber then color it red.
+        if agent.is_scrubber:
+            color = "red"
+        return {
+            "Shape": "circle", 
+            "Color": color, 
+            "Filled": "true", 
+            "Layer": 1,
+            "r": 1
+        }
+
+
+def discharge_portrayal():
+    return {
+        "Shape": "circle", 
+        "Color": "orange", 
+        "Filled": "true", 
+        "Layer": 0,
+        "r": 0.5
+    }
+
+
+def terrain_portrayal(is_water):
+    return {
+        "Shape": "rect", 
+        "Color": "lightblue" if is_water else "silver", 
+        "Filled": "true", 
+        "Layer": 0, 
+        "w": 1, 
+        "h": 1
+    }
+
+
+class TerrainCanvasGrid(CanvasGrid):
+    """
+    CanvasGrid that also draws the model's land/water mask and scrubber
+    discharge field, since neither is stored as agents in the grid.
+    """
+    def render(self, model):
+        grid_state = super().render(model)
+        background = []
+        for x in range(model.grid.width):
+            for y in range(model.grid.height):
+                portrayal = terrain_portrayal(model.water[x, y])
+                portrayal["x"] = x
+                portrayal["y"] = y
+                background.append(portrayal)
+        for x, y in np.argwhere(model.discharge.trails > 0).tolist():
+            portrayal = discharge_portrayal()
+            portrayal["x"] = x
+            portrayal["y"] = y
+            background.append(portrayal)
+        # draw terrain and discharge underneath everything else on layer 0
+        grid_state[0] = background + grid_state[0]
+        return grid_state
+
+# Create port name list for dropdown menu
+def get_port_names():
+    return [str(name) for name in load_port_table().names]
+
+
+def make_server(port=8521):
+    """The ModularServer for the model, listening on port."""
+    # grid set up
+    grid = TerrainCanvasGrid(agent_portrayal, 100, 100, 500, 500)
+    
+    # Get available port names for dropdown
+    port_names = get_port_names()
+
+    # Define the model parameters that can be set by the user
+    model_params = {
+        'width': 100,
+        'height': 100,
+        'num_ships': Slider("Number of Ships", 50, 10, 200, 10),
+        'ship_wait_time': Slider("Ship Wait Time", 100, 10, 200, 10),
+        'port_policy': UserSettableParameter('choice', 'Default Port Policy', 
+                                           value='allow',
+                                           choices=['allow', 'ban', 'tax', 'subsidy']),
+        'selected_port': UserSettableParameter('choice', 'Select Port to Configure', 
+                                             value="None",
+                                             choices=["None"] + port_names),
+        'selected_policy': UserSettableParameter('choice', 'Policy for Selected Port', 
+                                               value="None",
+                                               choices=["None", 'allow', 'ban', 'tax', 'subsidy'])
+    }
+
+    server = ModularServer(
+        ShipPortModel, 
+        [grid], 
+        'North Sea Watch',
+        model_params
+    )
+    
+    server.port = port
+    return server
+
+
+if __name__ == "__main__":
+    make_server().launch()
@@ -1,71 +1,56 @@
-from mesa import Agent, Model
-from mesa.time import RandomActivation
-from mesa.space import MultiGrid
-#leave this import for now for future data collection and visualization
-from mesa.datacollection import DataCollector
-from mesa.visualization.modules import CanvasGrid
-from mesa.visualization.ModularVisualization import ModularServer
-import csv
-from shapely.geometry import Polygon, Point
-from port import Port
+from mesa import Agent
 
-class ScrubberTrail(Agent):
-    """
-    Agent representing a discharge trail from a scrubber ship.
-    Carries 10 units of scrubber water and fades after a few steps.
+# ship types and their empirical proportions
+SHIP_TYPES = ['cargo', 'tanker', 'fishing', 'other', 'tug', 'passenger', 'hsc', 'dredging', 'search']
+SHIP_TYPE_WEIGHTS = [0.532, 0.213, 0.106, 0.032, 0.032, 0.053, 0.011, 0.011, 0.011]
+
+
+def base_scrubber_probability(ship_type):
     """
-    def __init__(self, unique_id, model, lifespan=60):
-        super().__init__(unique_id, model)
-        self.water_units = 10
-        self.lifespan = lifespan
-    
-    def step(self):
-        self.lifespan -= 1
-        if self.lifespan <= 0:
-            self.model.grid.remove_agent(self)
-            self.model.schedule.remove(self)
-            
-                
-class Terrain(Agent):
-    """"
-    A terrain agent in the North Sea simulation - static.
+    Probability that a ship of this type has a scrubber, before penalties.
     """
-    def __init__(self, unique_id, model, terrain_type):
-        super().__init__(unique_id, model)
-        self.terrain_type = terrain_type
+    if ship_type == 'cargo':
+        return 0.18
+    elif ship_type == 'tanker':
+        return 0.13
+    else:
+        return 0.05
+
 
 class Ship(Agent):
     """"
     A ship agent in the North Sea simulation - dynamic.
     """
-    def __init__(self, unique_id, model):
+    def __init__(self, unique_id, model, ship_type=None, is_scrubber=None):
         super().__init__(unique_id, model)
-        # assign ship type based on empirical proportions
-        self.ship_type = self.model.random.choices(
-            population=['cargo', 'tanker', 'fishing', 'other', 'tug', 'passenger', 'hsc', 'dredging', 'search'],
-            weights=[0.532, 0.213, 0.106, 0.032, 0.032, 0.053, 0.011, 0.011, 0.011],
-            k=1
-        )[0]
+        # assign ship type based on empirical proportions, unless the model
+        # already drew it (see ShipPortModel.spawn_ships)
+        if ship_type is None:
+            ship_type = self.model.random.choices(
+                population=SHIP_TYPES,
+                weights=SHIP_TYPE_WEIGHTS,
+                k=1
+            )[0]
+        self.ship_type = ship_type
         #ship is not docked in the first step
         self.docked = False
         #steps that ship was docked
         self.docking_steps = 0  
+        # port the ship is currently docked at
+        self.docked_port = None
         
         self.route = []
         self.current_target_index = 0
         
-        # update scrubber probability based on ship type
-        if self.ship_type == 'cargo':
-            base_prob = 0.18
-        elif self.ship_type == 'tanker':
-            base_prob = 0.13
-        else:
-            base_prob = 0.05
-            
-        # adjust probability based on model's average scrubber penalty
-        avg_penalty = self.model.get_average_penalty()
-        adjusted_prob = base_prob / (1 + avg_penalty)
-        self.is_scrubber = (self.model.random.random() < adjusted_prob)
+        if is_scrubber is None:
+            # update scrubber probability based on ship type
+            base_prob = base_scrubber_probability(self.ship_type)
+                
+            # adjust probability based on model's average scrubber penalty
+            avg_penalty = self.model.get_average_penalty()
+            adjusted_prob = base_prob / (1 + avg_penalty)
+            is_scrubber = (self.model.random.random() < adjusted_prob)
+        self.is_scrubber = is_scrubber
         
         # initialize ship penalty
         self.penalty = 0
@@ -82,11 +67,8 @@ class Ship(Agent):
             return 0
         
     def is_valid_move(self, pos):
-        cell_contents = self.model.grid.get_cell_list_contents(pos)
-        # valid if cell contains water and does NOT contain any Port instance.
-        is_water = any(isinstance(agent, Terrain) and agent.terrain_type == "water" for agent in cell_contents)
-        has_port = any(isinstance(agent, Port) for agent in cell_contents)
-        return is_water and not has_port
+        # valid if cell is water and does NOT contain a port.
+        return self.model.grid.is_open(pos)
     
     def move_along_route(self, target_pos, current_pos):
         # Calculate the ideal step direction.
@@ -98,8 +80,7 @@ class Ship(Agent):
             return
         
         # If the ideal move is blocked, look among neighbors.
-        neighbors = self.model.grid.get_neighborhood(current_pos, moore=True, include_center=False)
-        valid_neighbors = [pos for pos in neighbors if self.is_valid_move(pos)]
+        valid_neighbors = self.model.grid.open_neighbors(current_pos)
         if valid_neighbors:
             # Choose the neighbor that minimizes the Euclidean distance to the target.
             def distance(pos):
@@ -110,14 +91,22 @@ class Ship(Agent):
             # Fallback: If no valid neighbor was found, the ship stays in place.
             pass
                 
+    def navigate(self, field, target_pos):
+        """
+        Move one cell downhill on a navigation field. Falls back to the greedy
+        move_along_route when none of the field's targets can be reached from here.
+        """
+        next_pos = field.next_step(self.pos)
+        if next_pos is None:
+            self.move_along_route(target_pos, self.pos)
+        elif next_pos != self.pos:
+            self.model.grid.move_agent(self, next_pos)
+    
     def step(self):
         """
-        Ship movement method. 
+        Ship movement method. Only called for live ships: the schedule skips
+        ships removed earlier in the same step.
         """
-        # If already removed from the schedule, stop processing.
-        if self not in self.model.schedule.agents:
-            return
-        
          # If not already marked as exiting, check if the route is complete.
         if not hasattr(self, "exiting"):
             self.exiting = False
@@ -131,55 +120,43 @@ class Ship(Agent):
                 # print(f"Ship {self.unique_id} initiating exit due to timeout waiting to dock.")
                 
             # pick a target cell at the bottom of the english channel to exit form
+            # (only steered to directly when the exit zone is unreachable)
             if self.exiting and not hasattr(self, "exit_target"):
-                bottom_y = 0
-                x_range = min(38, self.model.grid.width) # width of the english channel (roughly)
-                possible_exits = []
-                for x in range(x_range):
-                    pos = (x, bottom_y)
-                    cell_contents = self.model.grid.get_cell_list_contents(pos)
-                    if any(isinstance(agent, Terrain) and agent.terrain_type == 'water' for agent in cell_contents):
-                        possible_exits.append(pos)
-                if possible_exits:
-                    self.exit_target = self.random.choice(possible_exits)
-                else:
-                    self.exit_target = (0, bottom_y)
+                self.exit_target = self.model.random_cell(self.model.exit_cells, (0, 0))
                     
-        # if exiting, move toward exit_target
+        # if exiting, move toward the exit zone
         if self.exiting:
             old_pos = self.pos
             target_pos = self.exit_target
-            self.move_along_route(target_pos, old_pos)
+            exit_field = self.model.exit_field
+            self.navigate(exit_field, target_pos)
             # leave a scrubber trail if the ship is a scrubber
             if self.is_scrubber and self.pos != old_pos:
-                new_trail = ScrubberTrail(self.model.next_trail_id, self.model)
-                self.model.next_trail_id += 1
-                self.model.grid.place_agent(new_trail, old_pos)
-                self.model.schedule.add(new_trail)
-            # when reached the exit cell, remove ship form simulation
-            if self.pos == target_pos:
+                self.model.discharge.add(old_pos)
+            # when reached an exit cell, remove ship form simulation
+            if self.pos == target_pos or exit_field.at_target(self.pos):
                 # print(f"Ship {self.unique_id} has exited the simulation at {self.pos}.")    
-                self.model.grid.remove_agent(self)
-                self.model.schedule.remove(self)
-                # Spawn a replacement ship so the total remains constant.
-                self.model.spawn_ship(self.model.next_ship_id)
-                self.model.next_ship_id += 1
+                # the model spawns a replacement at the end of the step so the total remains constant
+                self.model.remove_ship(self, replace=True)
                 return   
                            
         else:
             old_pos = self.pos  # save current position before moving
-            if self.route and self.current_target_index < len(self.route):
+            if self.docked:
+                # a docked ship stays moored until its docking time is up
+                pass
+            elif self.route and self.current_target_index < len(self.route):
                 target_port = self.route[self.current_target_index]
                 target_pos = target_port.pos # port's grid position
-                current_pos = self.pos
                 
-                self.move_along_route(target_pos, current_pos)
+                self.navigate(target_port.navigation_field, target_pos)
             
                 # If the ship is in or next to the target port's cell, attempt docking.
-                if self.pos == target_pos or target_pos in self.model.grid.get_neighborhood(self.pos, moore=True, include_center=True):
+                if max(abs(self.pos[0] - target_pos[0]), abs(self.pos[1] - target_pos[1])) <= 1:
                     success = target_port.dock_ship(self)
                     if success:
                         self.docked = True
+                        self.docked_port = target_port
                         self.docking_steps = 0
                         self.wait_time = 0  # reset when docked
                         # print(f'Ship {self.unique_id} docked at {target_port.name}')
@@ -206,21 +183,14 @@ class Ship(Agent):
             else:
                 # default random movement (water cells only) if no valid route is set
                 possible_steps = self.model.grid.get_neighborhood(self.pos, moore=True, include_center=True)
-                valid_steps = []
-                for pos in possible_steps:
-                    cell_contents = self.model.grid.get_cell_list_contents(pos)
-                    if any(isinstance(agent, Terrain) and agent.terrain_type == 'water' for agent in cell_contents):
-                        valid_steps.append(pos)
+                valid_steps = [pos for pos in possible_steps if self.model.water[pos]]
                 if valid_steps:
                     new_position = self.random.choice(valid_steps)
                     self.model.grid.move_agent(self, new_position)
                     
             # If the ship moved and is a scrubber ship, leave a trail
             if self.is_scrubber and self.pos != old_pos:
-                new_trail = ScrubberTrail(self.model.next_trail_id, self.model)
-                self.model.next_trail_id += 1
-                self.model.grid.place_agent(new_trail, old_pos)
-                self.model.schedule.add(new_trail)
+                self.model.discharge.add(old_pos)
             
             # Increase wait time when not docked.
             if not self.docked:
@@ -232,11 +202,9 @@ class Ship(Agent):
             self.docking_steps += 1      
             # After 10 steps, undock and, if a route is defined, move to the next target port.
             if self.docking_steps >= 10:
-                for agent in self.model.schedule.agents:
-                    if isinstance(agent, Port) and self in agent.docked_ships:
-                        agent.undock_ship(self)
-                        # print(f'Ship {self.unique_id} undocked from {agent.name}')
-                        self.docked = False
-                        # Advance to the next target port in the route.
-                        self.current_target_index += 1
-                        break
+                self.docked_port.undock_ship(self)
+                # print(f'Ship {self.unique_id} undocked from {self.docked_port.name}')
+                self.docked_port = None
+                self.docked = False
+                # Advance to the next target port in the route.
+                self.current_target_index += 1
@@ -0,0 +1,360 @@
+"""
+Parameter sweeps over ShipPortModel.
+
+A sweep expands a full-factorial grid or a Latin hypercube over num_ships,
+ship_wait_time, the tax and subsidy route weight multipliers and a set of port
+policy sets, and runs every (point, replicate) job over a process pool. Only a
+few jobs are in flight at a time, and each finished job is written straight
+away as Parquet files partitioned by the parameter values (hive layout), so
+memory stays flat however large the sweep is and readers can prune partitions:
+
+    read_sweep("data/sweep", filters=[("policy_set", "==", "all_tax"), ("tax_multiplier", "<", 0.5)])
+
+Every job's files are named after its parameters, seed and the code version,
+so rerunning an interrupted sweep only runs the jobs that are missing. An
+output directory holds one sweep: design.parquet records its points,
+settings and code version, and a sweep with other ones is refused.
+
+Example:
+    python sweep.py --num-ships 100 300 1000 --ship-wait-time 50 100 \
+        --tax-multiplier 0.25 0.5 --policy-sets none all_tax sweden_denmark --runs 5
+    python sweep.py --design lhs --points 40 --num-ships 100 1000 --ship-wait-time 20 200 \
+        --tax-multiplier 0.25 1 --subsidy-multiplier 1 2 --policy-sets none all_tax all_subsidy
+"""
+
+import argparse
+import itertools
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from experiment import DATA_DIR, SCENARIOS, Scenario, load_port_countries, worker_pool
+from mesa_model import ShipPortModel
+from replicate_cache import code_version, file_digest, replicate_key
+
+# swept parameters, in partition order, with whether they are integers
+PARAMETERS = {
+    "num_ships": True,
+    "ship_wait_time": True,
+    "tax_multiplier": False,
+    "subsidy_multiplier": False,
+}
+PARTITION_COLUMNS = tuple(PARAMETERS) + ("policy_set",)
+
+# policy sets besides the experiment scenarios' bans
+POLICY_SETS = ("none", "all_tax", "all_subsidy")
+
+
+def policy_set_policies(policy_set, port_to_country):
+    """
+    The custom_port_policies string of a policy set: "none", "all_tax",
+    "all_subsidy", a scenario name (its bans), or "name=port:policy, ...".
+    """
+    if "=" in policy_set:
+        return policy_set.split("=", 1)[1]
+    if policy_set == "none":
+        return "None"
+    if policy_set in ("all_tax", "all_subsidy"):
+        policy = policy_set[len("all_"):]
+        return ", ".join(f"{port}:{policy}" for port in port_to_country)
+    if policy_set in SCENARIOS:
+        return SCENARIOS[policy_set].custom_port_policies(port_to_country)
+    raise ValueError(f"unknown policy set {policy_set!r}, expected one of "
+                     f"{', '.join(POLICY_SETS + tuple(sorted(SCENARIOS)))} or name=port:policy,...")
+
+
+def policy_set_name(policy_set):
+    """The partition value of a policy set."""
+    name = policy_set.split("=", 1)[0]
+    if not re.fullmatch(r"[A-Za-z0-9_\-]+", name):
+        raise ValueError(f"policy set name {name!r} may only contain letters, digits, '_' and '-'")
+    return name
+
+
+def grid_design(levels, policy_sets):
+    """Every combination of the parameter levels and policy sets."""
+    names = list(PARAMETERS)
+    return [dict(zip(names, values), policy_set=policy_set)
+            for values in itertools.product(*(levels[name] for name in names))
+            for policy_set in policy_sets]
+
+
+def latin_hypercube(ranges, policy_sets, num_points, seed=0):
+    """
+    num_points points of a Latin hypercube: every (low, high) range and the
+    list of policy sets is split into num_points strata that are each used
+    once. Integer parameters are rounded and floats kept to three decimals,
+    so partition values stay readable.
+    """
+    from scipy.stats import qmc
+
+    names = list(PARAMETERS)
+    sample = qmc.LatinHypercube(d=len(names) + 1, seed=seed).random(num_points)
+    points = []
+    for row in sample:
+        point = {}
+        for name, q in zip(names, row):
+            low, high = ranges[name]
+            value = low + q * (high - low)
+            point[name] = int(round(value)) if PARAMETERS[name] else round(float(value), 3)
+        point["policy_set"] = policy_sets[min(int(row[-1] * len(policy_sets)), len(policy_sets) - 1)]
+        points.append(point)
+    return points
+
+
+class Sweep:
+    """
+    The jobs of a sweep and where their output goes. Every model shares the
+    grid size, coastline, engine and number of steps.
+    """
+    def __init__(self, points, output_dir, num_runs=5, num_steps=1000, seed=0, width=100, height=100,
+                 coastline=None, engine="fast"):
+        self.points = points
+        self.output_dir = output_dir
+        self.num_runs = num_runs
+        self.num_steps = num_steps
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.coastline = coastline
+        self.engine = engine
+
+    def model_params(self, point, port_to_country):
+        params = {name: point[name] for name in PARAMETERS}
+        params.update({
+            "width": self.width,
+            "height": self.height,
+            "coastline": self.coastline,
+            "engine": self.engine,
+            "port_policy": "allow",
+            "selected_port": "None",
+            "selected_policy": "None",
+            "custom_port_policies": policy_set_policies(point["policy_set"], port_to_country),
+        })
+        return params
+
+    def jobs(self, port_to_country):
+        """(point, replicate, model params, seed, file name) of every job."""
+        for point in self.points:
+            params = self.model_params(point, port_to_country)
+            for replicate in range(self.num_runs):
+                # replicate r runs with seed + r at every point, so points share random streams
+                seed = self.seed + replicate
+                name = f"rep{replicate:03d}-{replicate_key(params, self.num_steps, seed)[:16]}.parquet"
+                yield point, replicate, params, seed, name
+
+    def partition_dir(self, dataset, point):
+        parts = [f"{column}={policy_set_name(point[column]) if column == 'policy_set' else point[column]}"
+                 for column in PARTITION_COLUMNS]
+        return os.path.join(self.output_dir, dataset, *parts)
+
+    def design(self, port_to_country):
+        """
+        The swept points, one row each, with the policies their policy set
+        resolves to, the settings every point shares and the code version,
+        which together decide what the jobs produce.
+        """
+        design = pd.DataFrame(self.points)
+        # the partitions only carry a policy set's name, so the design keeps what it stands for
+        design["custom_port_policies"] = [policy_set_policies(p, port_to_country) for p in design["policy_set"]]
+        design["policy_set"] = [policy_set_name(p) for p in design["policy_set"]]
+        design["num_steps"] = self.num_steps
+        design["seed"] = self.seed
+        design["width"] = self.width
+        design["height"] = self.height
+        design["engine"] = self.engine
+        design["coastline"] = self.coastline or ""
+        design["coastline_digest"] = file_digest(self.coastline) if self.coastline else ""
+        design["code_version"] = code_version()
+        return design
+
+    def prepare_output(self, port_to_country):
+        """
+        Writes design.parquet next to the datasets, or, when the output
+        directory already holds a sweep, checks that it is this same sweep, so
+        results of different code versions or designs never share partitions.
+        """
+        path = os.path.join(self.output_dir, "design.parquet")
+        design = self.design(port_to_country)
+        if os.path.exists(path):
+            existing = pd.read_parquet(path)
+            if "code_version" not in existing or set(existing["code_version"]) != {code_version()}:
+                raise ValueError(f"{self.output_dir} holds a sweep written by another version of the model "
+                                 f"code; write this sweep to a new output directory")
+            if list(existing.columns) != list(design.columns) or not existing.astype(str).equals(design.astype(str)):
+                raise ValueError(f"{self.output_dir} holds a sweep with a different design or settings; "
+                                 f"write this sweep to a new output directory")
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        design.to_parquet(path, index=False)
+
+
+def run_job(params, num_steps, seed):
+    """
+    Runs one model and returns its per-step model reporters and per-port
+    totals (final cumulative revenue and mean docked ships).
+    """
+    model = ShipPortModel(**params, seed=seed)
+    for _ in range(num_steps):
+        model.step()
+    model_vars = model.datacollector.get_model_vars_dataframe()
+    model_vars.insert(0, "step", np.arange(len(model_vars), dtype=np.int32))
+    revenue = model.port_recorder.revenue_frame()
+    docking = model.port_recorder.docking_frame()
+    ports = pd.DataFrame({
+        "port": revenue.columns,
+        "revenue": revenue.iloc[-1].to_numpy() if len(revenue) else 0.0,
+        "mean_docked": docking.mean().to_numpy() if len(docking) else 0.0,
+    })
+    return model_vars.reset_index(drop=True), ports
+
+
+def write_frame(frame, path, replicate, seed):
+    """Writes one job's frame, tagged with its replicate, seed and code version, atomically."""
+    frame = frame.copy()
+    frame.insert(0, "replicate", np.int32(replicate))
+    frame.insert(1, "seed", np.int64(seed))
+    frame.insert(2, "code_version", code_version())
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write to a hidden temporary file first so an interrupted sweep never leaves a
+    # partial file that dataset readers would pick up
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.tmp")
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(sweep, workers=None, port_to_country=None):
+    """
+    Runs the sweep's missing jobs and writes every result as it completes
+    to <output_dir>/model and <output_dir>/ports. At most two jobs per worker
+    are queued at a time. workers=1 runs them in this process. Returns the
+    number of jobs run; raises ValueError when the output directory holds
+    another sweep (see Sweep.prepare_output).
+    """
+    if port_to_country is None:
+        port_to_country = load_port_countries()
+    sweep.prepare_output(port_to_country)
+    pending = []
+    for point, replicate, params, seed, name in sweep.jobs(port_to_country):
+        paths = [os.path.join(sweep.partition_dir(dataset, point), name) for dataset in ("model", "ports")]
+        if not all(os.path.exists(path) for path in paths):
+            pending.append((params, seed, replicate, paths))
+    total = sweep.num_runs * len(sweep.points)
+    if len(pending) < total:
+        print(f"sweep: {total - len(pending)} of {total} jobs already written")
+    if not pending:
+        return 0
+
+    def save(job, result):
+        _, seed, replicate, paths = job
+        for frame, path in zip(result, paths):
+            write_frame(frame, path, replicate, seed)
+
+    progress = tqdm(total=len(pending), desc="sweep jobs")
+    if workers == 1:
+        for job in pending:
+            save(job, run_job(job[0], sweep.num_steps, job[1]))
+            progress.update()
+    else:
+        # the pool only needs the grid size and coastline of the shared World
+        world = Scenario("sweep", width=sweep.width, height=sweep.height, coastline=sweep.coastline)
+        max_in_flight = 2 * (workers or os.cpu_count() or 1)
+        with worker_pool(workers, world) as executor:
+            jobs = iter(pending)
+            running = {}
+            while True:
+                for job in itertools.islice(jobs, max_in_flight - len(running)):
+                    running[executor.submit(run_job, job[0], sweep.num_steps, job[1])] = job
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    save(running.pop(future), future.result())
+                    progress.update()
+    progress.close()
+    return len(pending)
+
+
+def partition_schema():
+    """Types of the partition columns, so readers don't take the floats for strings."""
+    import pyarrow as pa
+    fields = [(name, pa.int64() if integer else pa.float64()) for name, integer in PARAMETERS.items()]
+    return pa.schema(fields + [("policy_set", pa.string())])
+
+
+def read_sweep(output_dir, dataset="model", filters=None, columns=None):
+    """
+    Reads the "model" or "ports" dataset of a sweep into a DataFrame. Filters on
+    partition columns (e.g. [("num_ships", ">=", 300)]) only open the matching files.
+    """
+    import pyarrow.dataset as ds
+    from pyarrow.parquet import filters_to_expression
+
+    data = ds.dataset(os.path.join(output_dir, dataset), format="parquet",
+                      partitioning=ds.partitioning(partition_schema(), flavor="hive"))
+    expression = filters_to_expression(filters) if filters else None
+    return data.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def parse_levels(values, integer):
+    return [int(v) if integer else float(v) for v in values]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep ShipPortModel parameters and write partitioned Parquet.")
+    parser.add_argument("--design", choices=("grid", "lhs"), default="grid",
+                        help="full-factorial grid over the given levels, or a Latin hypercube over "
+                             "(low, high) ranges")
+    parser.add_argument("--points", type=int, default=20, help="number of Latin hypercube points")
+    parser.add_argument("--num-ships", nargs="+", default=["300"])
+    parser.add_argument("--ship-wait-time", nargs="+", default=["100"])
+    parser.add_argument("--tax-multiplier", nargs="+", default=["0.5"])
+    parser.add_argument("--subsidy-multiplier", nargs="+", default=["1.5"])
+    parser.add_argument("--policy-sets", nargs="+", default=["none"],
+                        help=f"any of {', '.join(POLICY_SETS + tuple(sorted(SCENARIOS)))}, "
+                             "or name=port:policy,... for a custom set")
+    parser.add_argument("--runs", type=int, default=5, help="replicates per point")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--grid", default="100x100", help="grid size as WIDTHxHEIGHT")
+    parser.add_argument("--coastline", help="GeoJSON file with the land polygons in lon/lat")
+    parser.add_argument("--engine", choices=("agent", "fast"), default="fast")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default=os.path.join(DATA_DIR, "sweep"), help="output directory")
+    args = parser.parse_args(argv)
+
+    values = {"num_ships": args.num_ships, "ship_wait_time": args.ship_wait_time,
+              "tax_multiplier": args.tax_multiplier, "subsidy_multiplier": args.subsidy_multiplier}
+    levels = {name: parse_levels(values[name], integer) for name, integer in PARAMETERS.items()}
+    port_to_country = load_port_countries()
+    for policy_set in args.policy_sets:
+        try:
+            policy_set_name(policy_set)
+            policy_set_policies(policy_set, port_to_country)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.design == "grid":
+        points = grid_design(levels, args.policy_sets)
+    else:
+        for name, level in levels.items():
+            if len(level) != 2:
+                parser.error(f"--{name.replace('_', '-')} needs a low and a high value with --design lhs")
+        points = latin_hypercube(levels, args.policy_sets, args.points, seed=args.seed)
+
+    width, height = (int(size) for size in args.grid.lower().split("x"))
+    sweep = Sweep(points, args.output, num_runs=args.runs, num_steps=args.steps, seed=args.seed,
+                  width=width, height=height, coastline=args.coastline, engine=args.engine)
+    print(f"sweep: {len(points)} points x {args.runs} replicates -> {args.output}")
+    try:
+        sweep.prepare_output(port_to_country)
+    except ValueError as error:
+        parser.error(str(error))
+    run_sweep(sweep, workers=args.workers, port_to_country=port_to_country)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Static terrain for the North Sea simulation.
+
+The default land regions are hand-drawn polygons on the 100x100 grid and are
+scaled to other grid sizes. Alternatively the land can come from a coastline
+in lat/lon (a GeoJSON file), projected onto the grid with a GridProjection.
+Either way the polygons are rasterized into a water mask tile by tile through
+an STRtree, so memory stays bounded on large grids, and the result is cached on
+disk, so only the first model built for a given terrain and grid size pays for
+it.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# where rasterized masks are stored between runs
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "terrain")
+
+# grid size LAND_REGIONS (and the X/Y columns of the port table) were drawn on
+BASE_GRID_SIZE = 100
+# cells per side of the tiles the grid is rasterized in
+TILE_SIZE = 256
+
+#!DO NOT TRY TO CHANGE THIS WITHOUT ANDREY'S CONSENT CAUSE HE LOST HIS ABILITY TO SEE TRYING TO SET IT UP!
+LAND_REGIONS = [
+        # UK and islands
+        [(0, 0), (0,2), (26, 2), (26,0)], [(0,3), (0,5), (20,5), (20,3), (0,3)],
+        [(0,5),(0,24),(26,24),(32,14), (26,6),(0,6)], [(0,25),(20,25),(10,25),(0,25)],
+        [(0,26),(20,26),(10,26),(0,26)],[(0,27),(18,27),(10,27),(0,27)],
+        [(0, 28),(0,34), (18,34),(18,28),(0,28)],[(0, 34),(0,41), (10,41),(10,34),(0,34)],
+        [(11, 34),(11,38), (12,38),(12,34)],[(11, 39),(11,39), (11,39),(11,39)],
+        [(0, 42),(0,48), (10,41)], [(0, 52),(4,52), (4,52)], [(0, 56),(0,60), (6,60)],
+        [(0, 61),(0,68), (10,68), (5, 61)], [(8, 64),(8,65), (8,65)], [(9, 66),(9,65), (9,65)], 
+        [(0, 71),(0,76), (7, 76), (2, 71)], [(0, 80),(0,82), (2,82), (0, 80)], 
+        [(10, 89),(13, 95),(15,95),(10, 89)], [(10, 90),(10, 90), (10,90)],
+        
+        #France and NL
+        [(41, 0),(41,1), (46, 1),(47,0)], [(55, 0),(55, 5),(100,5), (100, 0)], 
+         [(57, 5),(57, 10),(100, 10), (100, 5)], [(56, 6),(56, 6), (56, 6)], 
+         [(59, 11),(59, 12),(100, 12), (100, 11)], [(51, 5),(51, 6),(54, 3)],
+         [(53, 10),(53, 13),(56, 10)], [(56, 11),(58, 11),(58, 11)],
+         [(63, 13),(71, 21),(71, 13)], [(72, 13),(72, 21),(79, 21), (82,13)], 
+         [(80, 19),(100, 19),(100, 12), (80,13)], [(72, 22),(79, 22),(79, 22)],
+         [(55, 15),(58, 15),(59, 15)], [(55, 16),(59, 23),(61, 17), (59,16)], 
+         [(59, 21),(60, 22), (60, 22)], [(66, 16),(68, 22,),(74, 22), (74,0)], 
+         [(75, 23),(78, 25),(78, 23)], [(86, 20),(86, 23),(100, 23), (100, 20)],
+         [(84, 23),(86, 23),(86, 23)], [(85, 24),(85, 27),(92, 23)], 
+         [(87, 30),(100, 30),(100, 27), (90, 27)], [(95, 27),(100, 27),(100, 24), (95,24)], 
+
+         #Denmark
+         [(87, 31),(89, 40),(100, 40), (100, 31)],[(89, 41),(87, 50),(97, 60), (100, 60), (100, 0)],
+         
+         #Norway and Sweden
+         [(60, 99),(100, 99),(100, 96), (60,96)], [(61, 95),(100, 95),(100, 95)],[(61, 91),(61, 95),(100, 95), (100,91)],
+         [(61, 84),(61, 90),(94, 90), (94, 84)], [(64, 81),(64, 84),(89, 84), (89, 81)],
+         [(70, 65),(64, 80),(94, 84), (80, 65)],[(95, 83), (95, 84), (95, 85)], [(96, 86), (95, 86), (97, 86)], 
+         [(96, 90), (95, 90), (95, 90)]
+        ]
+
+
+class GridProjection:
+    """
+    Linear mapping between lon/lat and grid cells: lon min_lon..max_lon onto
+    x 0..width-1 and lat min_lat..max_lat onto y 0..height-1 (north is up).
+    """
+    def __init__(self, min_lon, max_lon, min_lat, max_lat, width, height):
+        self.min_lon = min_lon
+        self.max_lon = max_lon
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def around(cls, lon, lat, width, height, margin=0.5):
+        """The projection whose bounds enclose the given points plus a margin in degrees."""
+        return cls(float(np.min(lon)) - margin, float(np.max(lon)) + margin,
+                   float(np.min(lat)) - margin, float(np.max(lat)) + margin, width, height)
+
+    @classmethod
+    def fit(cls, lon, lat, x, y, width, height, base_size=BASE_GRID_SIZE):
+        """
+        The projection that best matches known cells (x, y on a base_size grid)
+        of points at lon/lat, by least squares, scaled to width x height.
+        """
+        bounds = []
+        for degrees, cells in ((lon, x), (lat, y)):
+            slope, offset = np.polyfit(np.asarray(degrees, dtype=float), np.asarray(cells, dtype=float), 1)
+            bounds += [(0 - offset) / slope, (base_size - 1 - offset) / slope]
+        return cls(*bounds, width, height)
+
+    def to_grid(self, lat, lon):
+        """Grid cells (x, y) of lat/lon, clipped to the grid; works on scalars and arrays."""
+        x = np.rint((np.asarray(lon) - self.min_lon) / (self.max_lon - self.min_lon) * (self.width - 1))
+        y = np.rint((np.asarray(lat) - self.min_lat) / (self.max_lat - self.min_lat) * (self.height - 1))
+        x = np.clip(x, 0, self.width - 1).astype(int)
+        y = np.clip(y, 0, self.height - 1).astype(int)
+        return x, y
+
+    def to_lonlat(self, x, y):
+        """lon/lat of the centers of cells (x, y)."""
+        lon = self.min_lon + np.asarray(x) / (self.width - 1) * (self.max_lon - self.min_lon)
+        lat = self.min_lat + np.asarray(y) / (self.height - 1) * (self.max_lat - self.min_lat)
+        return lon, lat
+
+    def key(self):
+        return (self.min_lon, self.max_lon, self.min_lat, self.max_lat, self.width, self.height)
+
+
+def terrain_cache_key(regions, width, height):
+    """
+    Key for a rasterized mask: hash of the polygon coordinates and the grid size.
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{width}x{height}".encode())
+    if (width, height) != (BASE_GRID_SIZE, BASE_GRID_SIZE):
+        # masks for other sizes come from the scaled regions
+        digest.update(f"scaled from {BASE_GRID_SIZE}".encode())
+    for region in regions:
+        digest.update(repr([tuple(float(c) for c in point) for point in region]).encode())
+        digest.update(b";")
+    return digest.hexdigest()
+
+
+def rasterize_land(polygons, width, height, cell_coords, tile_size=TILE_SIZE):
+    """
+    Returns a boolean (width, height) array that is True where a cell center is
+    covered by any of the (shapely) polygons. cell_coords(x, y) maps cell index
+    arrays to the polygons' coordinate system. The grid is processed in tiles
+    of tile_size x tile_size cells, so only one tile of points exists at a time.
+    """
+    # shapely is only needed on a cache miss
+    import shapely
+    from shapely.strtree import STRtree
+
+    land = np.zeros((width, height), dtype=bool)
+    if len(polygons) == 0:
+        return land
+    tree = STRtree(polygons)
+    for x0 in range(0, width, tile_size):
+        for y0 in range(0, height, tile_size):
+            xs, ys = np.meshgrid(np.arange(x0, min(x0 + tile_size, width)),
+                                 np.arange(y0, min(y0 + tile_size, height)), indexing="ij")
+            px, py = cell_coords(xs.ravel(), ys.ravel())
+            points = shapely.points(px, py)
+            # pairs of (point index, polygon index) where the polygon covers the point
+            point_idx, _ = tree.query(points, predicate="covered_by")
+            tile = np.zeros(xs.size, dtype=bool)
+            tile[point_idx] = True
+            land[x0:x0 + xs.shape[0], y0:y0 + xs.shape[1]] = tile.reshape(xs.shape)
+    return land
+
+
+def scaled_cell_coords(width, height, base_size=BASE_GRID_SIZE):
+    """cell_coords for polygons drawn on a base_size x base_size grid."""
+    def cell_coords(x, y):
+        return (x * (base_size - 1) / max(1, width - 1), y * (base_size - 1) / max(1, height - 1))
+    return cell_coords
+
+
+def load_coastline(path):
+    """
+    Land polygons (lon/lat) from a GeoJSON file: a FeatureCollection, a single
+    Feature or a bare (Multi)Polygon geometry. Invalid polygons are repaired
+    and whatever has no area (lines, points) is dropped.
+    """
+    import shapely
+    from shapely.geometry import shape
+
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data.get("type") == "FeatureCollection":
+        geometries = [feature["geometry"] for feature in data["features"] if feature.get("geometry")]
+    elif data.get("type") == "Feature":
+        geometries = [data["geometry"]]
+    else:
+        geometries = [data]
+    polygons = []
+    for geometry in geometries:
+        for part in shapely.get_parts(shapely.make_valid(shape(geometry))):
+            if part.geom_type == "Polygon":
+                polygons.append(part)
+            elif part.geom_type == "MultiPolygon":
+                polygons.extend(part.geoms)
+    return polygons
+
+
+def split_polygons(polygons, bounds, pieces=16):
+    """
+    Clips polygons to a pieces x pieces grid of boxes over bounds (min_lon,
+    max_lon, min_lat, max_lat). A whole coastline then becomes many small
+    polygons, so the STRtree only tests the few near every tile.
+    """
+    import shapely
+
+    min_lon, max_lon, min_lat, max_lat = bounds
+    lons = np.linspace(min_lon, max_lon, pieces + 1)
+    lats = np.linspace(min_lat, max_lat, pieces + 1)
+    pieces_out = []
+    for polygon in polygons:
+        x_min, y_min, x_max, y_max = polygon.bounds
+        for i in range(pieces):
+            if lons[i + 1] < x_min or lons[i] > x_max:
+                continue
+            for j in range(pieces):
+                if lats[j + 1] < y_min or lats[j] > y_max:
+                    continue
+                piece = shapely.clip_by_rect(polygon, lons[i], lats[j], lons[i + 1], lats[j + 1])
+                pieces_out.extend(part for part in shapely.get_parts(piece) if part.geom_type == "Polygon")
+    return pieces_out
+
+
+def cached_mask(key, build, cache_dir=CACHE_DIR):
+    """
+    The array (a mask, or any other static table) stored under key in
+    cache_dir, built with build() on a miss; cache_dir=None always builds.
+    """
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, key + ".npy")
+        if os.path.exists(path):
+            return np.load(path)
+
+    array = build()
+
+    if path is not None:
+        # write to a temporary file first so parallel workers never read a partial array
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except OSError:
+            # the cache is only an optimisation; read-only checkouts rebuild every time
+            pass
+    return array
+
+
+def rasterize_water(regions, width, height, cache_dir=CACHE_DIR):
+    """
+    Water mask (water[x, y]) for the given land polygons, drawn on the
+    100x100 grid and scaled to width x height, loaded from the disk cache
+    when available.
+    """
+    def build():
+        import shapely
+        polygons = [shapely.Polygon(region) for region in regions]
+        return ~rasterize_land(polygons, width, height, scaled_cell_coords(width, height))
+    return cached_mask(terrain_cache_key(regions, width, height), build, cache_dir)
+
+
+def rasterize_coastline(path, projection, cache_dir=CACHE_DIR):
+    """
+    Water mask (water[x, y]) for the land polygons in a lat/lon GeoJSON file,
+    projected with projection, loaded from the disk cache when available.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        digest.update(f.read())
+    digest.update(repr(projection.key()).encode())
+
+    def build():
+        bounds = (projection.min_lon, projection.max_lon, projection.min_lat, projection.max_lat)
+        polygons = split_polygons(load_coastline(path), bounds)
+        return ~rasterize_land(polygons, projection.width, projection.height, projection.to_lonlat)
+    return cached_mask("coastline-" + digest.hexdigest(), build, cache_dir)
@@ -0,0 +1,233 @@
+"""
+The static world every ShipPortModel of a given grid size and coastline shares.
+
+Terrain, port cells, spawn/exit cells and the navigation tables are the same
+for every model and replicate, so they are built once per process as an
+immutable World (all arrays read-only) that models attach to. The navigation
+tables are also cached on disk, since on large grids they are the expensive
+part. A World can also be put in shared memory with share() and attached by
+other processes with attach(), so a worker pool maps one copy of the tables
+instead of building its own.
+"""
+import hashlib
+import json
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.ndimage import distance_transform_edt
+
+import navigation
+from navigation import Navigation, NavigationField
+from occupancy import cell_classes
+from port_table import load_port_table
+from terrain import BASE_GRID_SIZE, LAND_REGIONS, GridProjection, cached_mask, rasterize_coastline, rasterize_water
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "world")
+
+# arrays a World is made of; everything else is derived from them
+WORLD_ARRAYS = ("water", "passable", "port_cells", "directions")
+
+# share of the grid width, from the left, where the English Channel meets the
+# bottom edge; ships enter and leave on its water cells
+CHANNEL_WIDTH = 0.38
+
+
+def channel_cells(water):
+    """The water cells on the bottom row of the English Channel."""
+    width = water.shape[0]
+    channel_x = np.flatnonzero(water[:int(round(CHANNEL_WIDTH * width)), 0])
+    return np.column_stack([channel_x, np.zeros_like(channel_x)])
+
+
+def grid_projection(width, height, coastline=None):
+    """
+    The lon/lat projection of a grid. With a coastline it covers the GeoJSON
+    file's "bbox" ([west, south, east, north]) if it has one, and otherwise
+    the ports plus half a degree. Without one it is the projection that best
+    matches the port table's hand-placed X/Y cells.
+    """
+    table = load_port_table()
+    if coastline is None:
+        return GridProjection.fit(table.lon, table.lat, table.x, table.y, width, height)
+    with open(coastline, "r") as f:
+        bbox = json.load(f).get("bbox")
+    if bbox:
+        # 3D boxes are [west, south, low, east, north, high]
+        west, south, east, north = (bbox[0], bbox[1], bbox[3], bbox[4]) if len(bbox) == 6 else bbox
+        return GridProjection(west, east, south, north, width, height)
+    return GridProjection.around(table.lon, table.lat, width, height)
+
+
+def snap_to_water(cells, water):
+    """
+    Moves every cell that has no water in its Moore neighbourhood (so no ship
+    could ever dock there) to the nearest water cell.
+    """
+    width, height = water.shape
+    # water within one step of every cell
+    near_water = water.copy()
+    padded = np.pad(water, 1)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            near_water |= padded[1 + dx:1 + dx + width, 1 + dy:1 + dy + height]
+    stranded = ~near_water[cells[:, 0], cells[:, 1]]
+    if stranded.any() and water.any():
+        # index of the nearest water cell for every cell
+        _, (nearest_x, nearest_y) = distance_transform_edt(~water, return_indices=True)
+        x, y = cells[stranded, 0], cells[stranded, 1]
+        cells = cells.copy()
+        cells[stranded, 0] = nearest_x[x, y]
+        cells[stranded, 1] = nearest_y[x, y]
+    return cells
+
+
+class World:
+    """
+    Immutable static data for one grid size and coastline: water mask,
+    port cells (in port table order), passable mask and one table of
+    navigation directions per port plus one for the exit zone (the last
+    entry of directions).
+    """
+    _instances = {}
+
+    def __init__(self, width, height, arrays, shared=None, coastline=None):
+        self.width = width
+        self.height = height
+        self.coastline = coastline
+        self.projection = grid_projection(width, height, coastline)
+        for name in WORLD_ARRAYS:
+            array = arrays[name]
+            array.flags.writeable = False
+            setattr(self, name, array)
+        # shared memory blocks backing the arrays, kept open while the World lives
+        self._shared = shared or []
+
+        # candidate cells for every spawn and exit: all water cells, and the water
+        # cells on the bottom row of the English Channel where ships enter and leave
+        self.water_cells = np.argwhere(self.water)
+        self.spawn_cells = channel_cells(self.water)
+        self.exit_cells = self.spawn_cells
+        # land/water/port class of every cell, for the models' occupancy grids
+        self.cell_class = cell_classes(self.water, self.port_cells)
+        for cells in (self.water_cells, self.spawn_cells, self.cell_class):
+            cells.flags.writeable = False
+
+        self.port_fields = [NavigationField(None, self.directions[i]) for i in range(len(self.port_cells))]
+        self.exit_field = NavigationField(None, self.directions[-1])
+
+    @classmethod
+    def get(cls, width, height, coastline=None):
+        """
+        The World for this grid size and coastline (a lat/lon GeoJSON file, or
+        None for the built-in land regions), built on first use in this process.
+        """
+        key = (width, height, coastline)
+        if key not in cls._instances:
+            cls._instances[key] = cls(width, height, cls.build(width, height, coastline), coastline=coastline)
+        return cls._instances[key]
+
+    @staticmethod
+    def build(width, height, coastline=None, cache_dir=CACHE_DIR):
+        """Computes the world arrays for a grid size and coastline."""
+        table = load_port_table()
+        if coastline is None:
+            water = rasterize_water(LAND_REGIONS, width, height)
+            # the port table's X/Y cells are hand-placed on the 100x100 grid
+            scale_x = (width - 1) / (BASE_GRID_SIZE - 1)
+            scale_y = (height - 1) / (BASE_GRID_SIZE - 1)
+            port_cells = np.column_stack([np.rint(table.x * scale_x), np.rint(table.y * scale_y)])
+        else:
+            projection = grid_projection(width, height, coastline)
+            water = rasterize_coastline(coastline, projection)
+            port_cells = np.column_stack(projection.to_grid(table.lat, table.lon))
+        port_cells = snap_to_water(port_cells.astype(np.int32), water)
+        # ships can enter water cells without ports
+        passable = water.copy()
+        passable[port_cells[:, 0], port_cells[:, 1]] = False
+        return {
+            "water": water,
+            "passable": passable,
+            "port_cells": port_cells,
+            "directions": navigation_directions(passable, port_cells, channel_cells(water), cache_dir),
+        }
+
+    def share(self):
+        """
+        Copies the world into shared memory and returns a picklable handle that
+        other processes pass to World.attach. The caller owns the memory and
+        must call handle.unlink() when no process needs it anymore.
+        """
+        handle = SharedWorld(self.width, self.height, self.coastline)
+        for name in WORLD_ARRAYS:
+            array = getattr(self, name)
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            handle.blocks.append(block)
+            handle.specs.append((name, block.name, array.shape, array.dtype.str))
+        return handle
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Maps a shared world read-only and makes it this process's World for its
+        grid size and coastline, so models built afterwards use it.
+        """
+        key = (handle.width, handle.height, handle.coastline)
+        if key in cls._instances:
+            return cls._instances[key]
+        arrays, blocks = {}, []
+        for name, block_name, shape, dtype in handle.specs:
+            block = shared_memory.SharedMemory(name=block_name)
+            arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            blocks.append(block)
+        cls._instances[key] = cls(handle.width, handle.height, arrays, shared=blocks, coastline=handle.coastline)
+        return cls._instances[key]
+
+
+def navigation_directions(passable, port_cells, exit_cells, cache_dir=CACHE_DIR):
+    """
+    Directions toward every port and then the exit zone, stacked, loaded from
+    the disk cache when these exact cells were computed before by the same
+    navigation code. Only one distance field exists at a time, so memory stays
+    at the directions (one byte per cell and target).
+    """
+    digest = hashlib.sha1()
+    # tables computed by an older navigation.py are stale
+    with open(navigation.__file__, "rb") as f:
+        digest.update(f.read())
+    for array in (passable, port_cells, exit_cells):
+        digest.update(repr(array.shape).encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+    def build():
+        fields = Navigation(passable, keep_distance=False)
+        directions = np.empty((len(port_cells) + 1,) + passable.shape, dtype=np.int8)
+        for i, cell in enumerate(port_cells.tolist()):
+            directions[i] = fields.port_field(tuple(cell)).direction
+        directions[-1] = fields.exit_field(exit_cells).direction
+        return directions
+    return cached_mask("directions-" + digest.hexdigest(), build, cache_dir)
+
+
+class SharedWorld:
+    """Names and layout of a World's shared memory blocks."""
+    def __init__(self, width, height, coastline=None):
+        self.width = width
+        self.height = height
+        self.coastline = coastline
+        self.specs = []
+        self.blocks = []
+
+    def __getstate__(self):
+        # only the names travel to other processes
+        state = self.__dict__.copy()
+        state["blocks"] = []
+        return state
+
+    def unlink(self):
+        """Frees the shared memory; only the process that called share() does this."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
@@ -0,0 +1,110 @@
+"""
+Regression tests for behaviour the optimisations must keep: the baseline
+terrain and ports, runs that are reproduced by checkpoints, forks and the
+process pool, and runs that profiling leaves unchanged. Sweeps must also
+refuse an output directory that holds another sweep.
+"""
+import csv
+import os
+
+import numpy as np
+import pandas.testing as pdt
+import pytest
+from shapely.geometry import Point, Polygon
+
+from experiment import Scenario, run_replicates
+from mesa_model import ShipPortModel
+from port_table import PORT_CSV
+from sweep import Sweep, grid_design
+from terrain import LAND_REGIONS, rasterize_water
+from world import World
+
+
+def collected(model):
+    """The frames a finished run hands to the experiments."""
+    return (model.datacollector.get_model_vars_dataframe(),
+            model.port_recorder.revenue_frame(),
+            model.port_recorder.docking_frame())
+
+
+def assert_same_run(a, b):
+    for frame_a, frame_b in zip(collected(a), collected(b)):
+        pdt.assert_frame_equal(frame_a, frame_b)
+
+
+def run(model, steps):
+    for _ in range(steps):
+        model.step()
+    return model
+
+
+def test_water_mask_matches_baseline():
+    # the baseline placed a land Terrain agent on every cell a land polygon covers
+    polygons = [Polygon(region) for region in LAND_REGIONS]
+    expected = np.array([[not any(p.covers(Point(x, y)) for p in polygons) for y in range(100)]
+                         for x in range(100)])
+    np.testing.assert_array_equal(rasterize_water(LAND_REGIONS, 100, 100, cache_dir=None), expected)
+    np.testing.assert_array_equal(World.get(100, 100).water, expected)
+
+
+def test_port_cells_match_baseline():
+    # the baseline placed every port at the X/Y cell of its CSV row, in row order
+    with open(PORT_CSV, newline="") as f:
+        expected = [[int(row["X"]), int(row["Y"])] for row in csv.DictReader(f)]
+    assert World.get(100, 100).port_cells.tolist() == expected
+    model = ShipPortModel(100, 100, 0, seed=0)
+    assert [list(port.pos) for port in model.ports] == expected
+
+
+def test_checkpoint_restore_continues_run(tmp_path):
+    path = os.path.join(tmp_path, "model.pkl.gz")
+    model = run(ShipPortModel(100, 100, 60, ship_wait_time=40, seed=1), 30)
+    model.save_checkpoint(path)
+    restored = ShipPortModel.load_checkpoint(path)
+    assert_same_run(run(model, 30), run(restored, 30))
+
+
+def test_fork_continues_run():
+    model = run(ShipPortModel(100, 100, 60, ship_wait_time=40, seed=2, engine="fast"), 30)
+    fork = model.fork()
+    assert_same_run(run(model, 30), run(fork, 30))
+
+
+def test_parallel_replicates_match_serial():
+    scenario = Scenario("test", ban_countries=("NL",), num_ships=40, num_steps=40, num_runs=3, seed=5)
+    serial = run_replicates(scenario, workers=1, use_cache=False)
+    parallel = run_replicates(scenario, workers=2, use_cache=False)
+    for a, b in zip(serial, parallel):
+        assert a.keys() == b.keys()
+        for key in a:
+            pdt.assert_frame_equal(a[key], b[key])
+
+
+@pytest.mark.parametrize("engine", ["agent", "fast"])
+def test_profiling_leaves_run_unchanged(engine):
+    plain = run(ShipPortModel(100, 100, 60, ship_wait_time=40, seed=3, engine=engine), 40)
+    profiled = run(ShipPortModel(100, 100, 60, ship_wait_time=40, seed=3, engine=engine, profile=True), 40)
+    assert_same_run(plain, profiled)
+    assert len(profiled.profile_frame()) == 40
+
+
+def small_sweep(output_dir, policy_set):
+    levels = {"num_ships": [10], "ship_wait_time": [20], "tax_multiplier": [0.5], "subsidy_multiplier": [1.5]}
+    return Sweep(grid_design(levels, [policy_set]), str(output_dir), num_runs=1, num_steps=5)
+
+
+def test_sweep_refuses_other_code_version(tmp_path, monkeypatch):
+    ports = {"gothenburg": "SE", "rotterdam": "NL"}
+    small_sweep(tmp_path, "none").prepare_output(ports)
+    monkeypatch.setattr("sweep.code_version", lambda: "0" * 40)
+    with pytest.raises(ValueError, match="another version of the model code"):
+        small_sweep(tmp_path, "none").prepare_output(ports)
+
+
+def test_sweep_refuses_changed_policy_set(tmp_path):
+    ports = {"gothenburg": "SE", "rotterdam": "NL"}
+    small_sweep(tmp_path, "x=gothenburg:ban").prepare_output(ports)
+    # the same sweep again is fine, the same policy set name for other ports is not
+    small_sweep(tmp_path, "x=gothenburg:ban").prepare_output(ports)
+    with pytest.raises(ValueError, match="different design or settings"):
+        small_sweep(tmp_path, "x=rotterdam:ban").prepare_output(ports)